@@ -0,0 +1,80 @@
+"""
+Compares the throughput of `Client.get` using the pooled keep-alive session against opening a new session per request,
+using a local uvicorn server. Run from the root of the repository via
+
+    python -m benchmark.client_session --requests 500
+"""
+
+import argparse
+import threading
+import time
+from datetime import date
+import requests
+import uvicorn
+from sqlalchemy import create_engine
+from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.pool import StaticPool
+from starlette.applications import Starlette
+from auto_schema import AutoMarshmallowSchema
+from pyalfred.contract.client import Client
+from pyalfred.server import DatabaseResource
+from test.model import Base, Task, TaskType
+
+
+class UnpooledClient(Client):
+    def _send(self, request, session=None):
+        with requests.Session() as s:
+            return super()._send(request, s)
+
+
+def make_app():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    session_factory = scoped_session(sessionmaker(bind=engine))
+
+    session = session_factory()
+    session.add_all(Task(name=f"task-{i}", finished_by=date.today(), type=TaskType.Task) for i in range(10))
+    session.commit()
+    session_factory.remove()
+
+    schema = AutoMarshmallowSchema.generate_schema(Task)
+    app = Starlette()
+    app.add_route(f"/{Client.make_endpoint(schema)}", DatabaseResource.make_endpoint(schema, session_factory))
+
+    return app
+
+
+def start_server(port: int) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(make_app(), port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+
+    while not server.started:
+        time.sleep(0.01)
+
+    return server
+
+
+def measure(client: Client, n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        client.get(Task, operations="limit 1")
+
+    return n / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--port", type=int, default=5123)
+    args = parser.parse_args()
+
+    server = start_server(args.port)
+    base_url = f"http://127.0.0.1:{args.port}"
+
+    with UnpooledClient(base_url) as client:
+        print(f"New session per request: {measure(client, args.requests):.1f} requests/s")
+
+    with Client(base_url) as client:
+        print(f"Pooled session: {measure(client, args.requests):.1f} requests/s")
+
+    server.should_exit = True
@@ -0,0 +1,83 @@
+"""
+Measures the latency of fast GET requests while slow GET requests are in flight against the same worker. Run from the
+root of the repository via
+
+    python -m benchmark.concurrency --slow 20 --fast 200 --delay 0.25
+"""
+
+import argparse
+import asyncio
+import time
+from datetime import date
+import httpx
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.pool import StaticPool
+from starlette.applications import Starlette
+from auto_schema import AutoMarshmallowSchema
+from pyalfred.server import DatabaseResource
+from test.model import Base, Task, TaskType, Attachment
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def make_app(delay: float, thread_limit: int):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def simulate_slow_query(conn, cursor, statement, parameters, context, executemany):
+        if Attachment.__tablename__ in statement:
+            time.sleep(delay)
+
+    Base.metadata.create_all(engine)
+    session_factory = scoped_session(sessionmaker(bind=engine))
+
+    session = session_factory()
+    session.add_all(Task(name=f"task-{i}", finished_by=date.today(), type=TaskType.Task) for i in range(100))
+    session.commit()
+    session_factory.remove()
+
+    app = Starlette()
+    for model in (Task, Attachment):
+        schema = AutoMarshmallowSchema.generate_schema(model)
+        endpoint = DatabaseResource.make_endpoint(schema, session_factory, thread_limit=thread_limit)
+        app.add_route(f"/{model.__tablename__}", endpoint)
+
+    return app
+
+
+async def timed_get(client: httpx.AsyncClient, url: str, start: float):
+    resp = await client.get(url)
+    resp.raise_for_status()
+
+    return time.perf_counter() - start
+
+
+async def run(args):
+    app = make_app(args.delay, args.thread_limit)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        start = time.perf_counter()
+        slow = [timed_get(client, f"/{Attachment.__tablename__}", start) for _ in range(args.slow)]
+        fast = [timed_get(client, f"/{Task.__tablename__}", start) for _ in range(args.fast)]
+
+        latencies = await asyncio.gather(*slow, *fast)
+        elapsed = time.perf_counter() - start
+
+    fast_latencies = latencies[args.slow :]
+    print(f"Total wall time: {elapsed:.3f}s")
+    print(f"Fast requests p50: {1e3 * percentile(fast_latencies, 0.5):.1f}ms")
+    print(f"Fast requests p99: {1e3 * percentile(fast_latencies, 0.99):.1f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--slow", type=int, default=20)
+    parser.add_argument("--fast", type=int, default=200)
+    parser.add_argument("--delay", type=float, default=0.25)
+    parser.add_argument("--thread-limit", type=int, default=10)
+
+    asyncio.run(run(parser.parse_args()))
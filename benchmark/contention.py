@@ -0,0 +1,92 @@
+"""
+Measures read and write throughput when readers and writers hit the same rows concurrently. Row locks are only taken by
+databases supporting `SELECT ... FOR UPDATE`, so point `SQLALCHEMY_DATABASE_URI` to e.g. Postgres and run from the root
+of the repository via
+
+    python -m benchmark.contention --readers 16 --writers 4 --duration 10
+    python -m benchmark.contention --readers 16 --writers 4 --duration 10 --read-ops "for update"
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from datetime import date
+import httpx
+from sqlalchemy import create_engine
+from sqlalchemy.orm import scoped_session, sessionmaker
+from starlette.applications import Starlette
+from auto_schema import AutoMarshmallowSchema
+from pyalfred.server import DatabaseResource
+from test.model import Base, Task, TaskType
+
+
+def make_app(url: str, rows: int, thread_limit: int):
+    engine = create_engine(url, pool_size=thread_limit, max_overflow=0)
+
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    session_factory = scoped_session(sessionmaker(bind=engine))
+
+    session = session_factory()
+    session.add_all(Task(name=f"task-{i}", finished_by=date.today(), type=TaskType.Task) for i in range(rows))
+    session.commit()
+    session_factory.remove()
+
+    schema = AutoMarshmallowSchema.generate_schema(Task)
+    app = Starlette()
+    app.add_route("/task", DatabaseResource.make_endpoint(schema, session_factory, thread_limit=thread_limit))
+
+    return app
+
+
+async def reader(client: httpx.AsyncClient, ops: str, deadline: float) -> int:
+    done = 0
+    while time.perf_counter() < deadline:
+        (await client.get("/task", params={"ops": ops})).raise_for_status()
+        done += 1
+
+    return done
+
+
+async def writer(client: httpx.AsyncClient, rows: int, deadline: float) -> int:
+    done = 0
+    while time.perf_counter() < deadline:
+        body = [
+            {"id": i + 1, "name": f"task-{i}", "finished_by": date.today().isoformat(), "type": "Note"}
+            for i in range(rows)
+        ]
+        (await client.patch("/task", json=body, params={"batched": "true"})).raise_for_status()
+        done += 1
+
+    return done
+
+
+async def run(args):
+    app = make_app(args.url, args.rows, args.thread_limit)
+    deadline = time.perf_counter() + args.duration
+
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        readers = [reader(client, args.read_ops, deadline) for _ in range(args.readers)]
+        writers = [writer(client, args.rows, deadline) for _ in range(args.writers)]
+
+        done = await asyncio.gather(*readers, *writers)
+
+    print(f"Read ops: '{args.read_ops}'")
+    print(f"Reads/s: {sum(done[: args.readers]) / args.duration:.1f}")
+    print(f"Writes/s: {sum(done[args.readers :]) / args.duration:.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default=os.environ.get("SQLALCHEMY_DATABASE_URI", "sqlite:///benchmark.db"))
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--readers", type=int, default=16)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--thread-limit", type=int, default=10)
+    parser.add_argument("--read-ops", default="")
+
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,43 @@
+"""
+Compares the time spent serializing and deserializing `Task` rows in each of the supported wire formats, including the
+marshmallow dump/load that precedes encoding on the server and follows decoding on the client. Run from the root of
+the repository via
+
+    python -m benchmark.formats --rows 100000
+"""
+
+import argparse
+import time
+from datetime import date
+from auto_schema import AutoMarshmallowSchema
+from pyalfred.contract.formats import FORMATS
+from test.model import Task, TaskType
+
+
+def timed(f, *args):
+    start = time.perf_counter()
+    res = f(*args)
+
+    return res, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100000)
+    args = parser.parse_args()
+
+    objects = [Task(id=i, name=f"task-{i}", finished_by=date.today(), type=TaskType.Task) for i in range(args.rows)]
+    schema = AutoMarshmallowSchema.generate_schema(Task)(many=True)
+
+    dump, dump_time = timed(schema.dump, objects)
+    _, load_time = timed(schema.load_instance, dump)
+    print(f"marshmallow: dump {dump_time:.3f}s, load {load_time:.3f}s")
+
+    for media_type, fmt in FORMATS.items():
+        content, encode_time = timed(fmt.encode, dump)
+        _, decode_time = timed(fmt.decode, content)
+
+        print(
+            f"{media_type}: encode {encode_time:.3f}s, decode {decode_time:.3f}s, "
+            f"{len(content) / 2 ** 20:.1f} MiB"
+        )
@@ -0,0 +1,130 @@
+"""
+Generates bursts of identical GET requests and heavy PUT requests against a single endpoint with slow queries, and
+reports the responses by status, their latencies and the number of queries run. Compare coalescing of the reads and
+admission control of the writes against the defaults, running from the root of the repository via
+
+    python -m benchmark.load --gets 100 --puts 20
+    python -m benchmark.load --gets 100 --puts 20 --coalesce --max-concurrency 4 --max-queue 8 --queue-timeout 1
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from collections import Counter
+from datetime import date
+import httpx
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import scoped_session, sessionmaker
+from starlette.applications import Starlette
+from auto_schema import AutoMarshmallowSchema
+from pyalfred.server import DatabaseResource, AdmissionControl
+from test.model import Base, Task, TaskType
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def make_app(args, queries: Counter):
+    # NB: A file, rather than a single shared in-memory connection, so that writes may run concurrently with reads
+    path = os.path.join(tempfile.mkdtemp(), "load.db")
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False, "timeout": 60})
+    Base.metadata.create_all(engine)
+
+    session_factory = scoped_session(sessionmaker(bind=engine))
+
+    session = session_factory()
+    session.add_all(Task(name=f"task-{i}", finished_by=date.today(), type=TaskType.Task) for i in range(1000))
+    session.commit()
+    session_factory.remove()
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def simulate_slow_query(conn, cursor, statement, parameters, context, executemany):
+        kind = statement.lstrip().split(" ", 1)[0].upper()
+        queries[kind] += 1
+
+        if kind == "SELECT":
+            time.sleep(args.delay)
+
+    # NB: Reads are left to coalescing, while writes share the admission control
+    admission_control = None
+    if args.max_concurrency is not None:
+        writes = AdmissionControl(args.max_concurrency, args.max_queue, args.queue_timeout)
+        admission_control = {"PUT": writes, "PATCH": writes, "DELETE": writes}
+
+    app = Starlette()
+    schema = AutoMarshmallowSchema.generate_schema(Task)
+    endpoint = DatabaseResource.make_endpoint(
+        schema,
+        session_factory,
+        create_ignore=["id"],
+        thread_limit=args.thread_limit,
+        coalesce_reads=args.coalesce,
+        admission_control=admission_control,
+    )
+    app.add_route("/task", endpoint)
+
+    return app
+
+
+async def timed(request, start: float):
+    resp = await request
+
+    return resp.status_code, time.perf_counter() - start
+
+
+async def run(args):
+    queries = Counter()
+    app = make_app(args, queries)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        records = [
+            {"name": f"new-{i}-{j}", "finished_by": date.today().isoformat(), "type": TaskType.Task.value}
+            for i in range(args.puts)
+            for j in range(args.put_size)
+        ]
+
+        params = {"bulk": "true"}
+
+        start = time.perf_counter()
+        gets = [timed(client.get("/task", params={"ops": "order by id,limit 100"}), start) for _ in range(args.gets)]
+        puts = [
+            timed(client.put("/task", params=params, json=records[i * args.put_size : (i + 1) * args.put_size]), start)
+            for i in range(args.puts)
+        ]
+
+        results = await asyncio.gather(*gets, *puts)
+        elapsed = time.perf_counter() - start
+
+    print(f"Total wall time: {elapsed:.3f}s")
+    print(f"Queries: {dict(queries)}")
+
+    for name, subset in (("GET", results[: args.gets]), ("PUT", results[args.gets :])):
+        if not subset:
+            continue
+
+        statuses = Counter(status for status, _ in subset)
+        latencies = [latency for _, latency in subset]
+        print(
+            f"{name}: {dict(statuses)}, p50 {1e3 * percentile(latencies, 0.5):.1f}ms, "
+            f"p99 {1e3 * percentile(latencies, 0.99):.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--gets", type=int, default=100, help="The number of concurrent identical GET requests")
+    parser.add_argument("--puts", type=int, default=20, help="The number of concurrent PUT requests")
+    parser.add_argument("--put-size", type=int, default=500, help="The number of rows per PUT request")
+    parser.add_argument("--delay", type=float, default=0.05, help="The simulated duration of each query in seconds")
+    parser.add_argument("--thread-limit", type=int, default=10)
+    parser.add_argument("--coalesce", action="store_true")
+    parser.add_argument("--max-concurrency", type=int, default=None, help="The maximum number of concurrent writes")
+    parser.add_argument("--max-queue", type=int, default=0)
+    parser.add_argument("--queue-timeout", type=float, default=None)
+    args = parser.parse_args()
+
+    asyncio.run(run(args))
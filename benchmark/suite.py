@@ -0,0 +1,256 @@
+"""
+Benchmarks the hot paths of the server and the client against the application of `example/app.py`, served by a local
+uvicorn on a SQLite file. Each case runs in a fresh process on a fresh database, and reports rows/s, the p50/p99
+latency of its requests and the peak RSS of the process (i.e. server and client). Run from the root of the repository
+via
+
+    python -m benchmark.suite --rows 1000 100000
+    python -m benchmark.suite --rows 1000000 --cases raw.get client.get --relations without
+
+Results are compared against `benchmark/baseline.json` if it exists, failing if the throughput of any case regressed by
+more than `--tolerance`. Store the results of the reference machine as the baseline via `--save`.
+
+Cases named `client.*` go through `Client`, i.e. include the marshmallow (de)serialization on the client, while cases
+named `raw.*` send JSON directly to the `DatabaseResource` verbs. Cases with relationships give each task two
+attachments, which are loaded and dumped by the server. Gets page through all rows via continuation tokens.
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date
+import requests
+import uvicorn
+from sqlalchemy import create_engine, insert
+
+EXAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "example")
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+CASES = (
+    "client.create",
+    "client.get",
+    "client.update",
+    "client.delete",
+    "raw.put",
+    "raw.get",
+    "raw.patch",
+    "raw.delete",
+)
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def populate(url: str, rows: int, relations: bool):
+    from models import Base, Task, TaskAttachment
+
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+
+    if rows == 0:
+        return
+
+    today = date.today()
+    with engine.begin() as conn:
+        for start in range(0, rows, 10000):
+            ids = range(start + 1, min(start + 10000, rows) + 1)
+            tasks = [{"id": i, "name": f"task-{i}", "finished_by": today, "type": "Task"} for i in ids]
+            conn.execute(insert(Task.__table__), tasks)
+
+            if relations:
+                attachments = [{"task_id": i, "location": f"location-{i}-{j}"} for i in ids for j in range(2)]
+                conn.execute(insert(TaskAttachment.__table__), attachments)
+
+    engine.dispose()
+
+
+def start_server(app) -> (uvicorn.Server, str):
+    server = uvicorn.Server(uvicorn.Config(app, port=0, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+
+    while not server.started:
+        time.sleep(0.01)
+
+    port = server.servers[0].sockets[0].getsockname()[1]
+
+    return server, f"http://127.0.0.1:{port}"
+
+
+def run_case(case: str, rows: int, relations: bool, batch: int) -> dict:
+    """
+    Runs `case` on a fresh database, returning the measurements.
+    """
+
+    sys.path.insert(0, EXAMPLE)
+    from models import Task, TaskAttachment, TaskType
+    from app import init_app
+    from auto_schema import AutoMarshmallowSchema
+    from pyalfred.contract.client import Client
+
+    folder = tempfile.mkdtemp()
+    url = f"sqlite:///{os.path.join(folder, 'benchmark.db')}?check_same_thread=false"
+    os.environ["SQLALCHEMY_DATABASE_URI"] = url
+
+    populate(url, 0 if case.endswith(("create", "put")) else rows, relations)
+    server, base_url = start_server(init_app())
+
+    latencies = list()
+
+    class TimedClient(Client):
+        def _send(self, request, session=None):
+            start = time.perf_counter()
+            try:
+                return super()._send(request, session)
+            finally:
+                latencies.append(time.perf_counter() - start)
+
+    session = requests.Session()
+
+    def send(method, endpoint, **kwargs):
+        start = time.perf_counter()
+        resp = session.request(method, f"{base_url}/{endpoint}", **kwargs)
+        latencies.append(time.perf_counter() - start)
+
+        if resp.status_code != 200:
+            raise Exception(f"Got error code {resp.status_code}: {resp.text}")
+
+        return resp
+
+    client = TimedClient(base_url)
+    task, attachment = (Client.make_endpoint(AutoMarshmallowSchema.get_schema(m)) for m in (Task, TaskAttachment))
+    today = date.today()
+    chunks = [range(s + 1, min(s + batch, rows) + 1) for s in range(0, rows, batch)]
+
+    start = time.perf_counter()
+
+    if case == "client.create":
+        for c in chunks:
+            tasks = [Task(name=f"task-{i}", finished_by=today, type=TaskType.Task) for i in c]
+            tasks = client.create(tasks, load_only=["id"])
+
+            if relations:
+                attachments = [TaskAttachment(task_id=t.id, location=f"{t.id}-{j}") for t in tasks for j in range(2)]
+                client.create(attachments, load_only=["id"])
+    elif case == "client.get":
+        assert sum(1 for _ in client.iter(Task, page_size=batch)) == rows
+    elif case == "client.update":
+        for c in chunks:
+            client.update([Task(id=i, name=f"renamed-{i}", finished_by=today, type=TaskType.Task) for i in c])
+    elif case == "client.delete":
+        for c in chunks:
+            client.delete([Task(id=i) for i in c])
+    elif case == "raw.put":
+        for c in chunks:
+            records = [{"name": f"task-{i}", "finished_by": today.isoformat(), "type": "Task"} for i in c]
+            tasks = send("put", task, json=records).json()
+
+            if relations:
+                records = [{"task_id": t["id"], "location": f"{t['id']}-{j}"} for t in tasks for j in range(2)]
+                send("put", attachment, json=records)
+    elif case == "raw.get":
+        n, token = 0, None
+        while True:
+            ops = f"page {batch:d}" + (f",after {token}" if token else "")
+            resp = send("get", task, params={"ops": ops})
+            n += len(resp.json())
+
+            token = resp.headers.get("X-Next-Page")
+            if token is None:
+                break
+
+        assert n == rows
+    elif case == "raw.patch":
+        for c in chunks:
+            records = [{"id": i, "name": f"renamed-{i}", "finished_by": today.isoformat(), "type": "Task"} for i in c]
+            send("patch", task, json=records)
+    elif case == "raw.delete":
+        for c in chunks:
+            send("delete", task, json=[{"id": i} for i in c])
+    else:
+        raise ValueError(f"Unknown case: {case}")
+
+    elapsed = time.perf_counter() - start
+    server.should_exit = True
+
+    return {
+        "rows_per_second": rows / elapsed,
+        "p50": percentile(latencies, 0.5),
+        "p99": percentile(latencies, 0.99),
+        "requests": len(latencies),
+        # NB: In KiB on Linux
+        "peak_rss_mib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def main(args):
+    baseline = dict()
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+
+    results = dict()
+    regressions = list()
+
+    print(f"{'case':<40}{'rows/s':>12}{'p50 ms':>10}{'p99 ms':>10}{'RSS MiB':>10}{'vs base':>10}")
+
+    for rows in args.rows:
+        for relations in {"with": [True], "without": [False], "both": [False, True]}[args.relations]:
+            for case in args.cases:
+                key = f"{case}:{rows:d}:{'relations' if relations else 'plain'}"
+                command = [sys.executable, "-m", "benchmark.suite", "--run-case", case, "--rows", str(rows)]
+                command += ["--batch", str(args.batch)] + (["--with-relations"] if relations else [])
+
+                proc = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+                if proc.returncode != 0:
+                    print(f"{key:<40}failed: {proc.stderr.strip().splitlines()[-1][:200]}")
+                    continue
+
+                result = results[key] = json.loads(proc.stdout.strip().splitlines()[-1])
+
+                comparison = ""
+                if key in baseline:
+                    change = result["rows_per_second"] / baseline[key]["rows_per_second"] - 1.0
+                    comparison = f"{100 * change:+.1f}%"
+
+                    if change < -args.tolerance:
+                        regressions.append(key)
+
+                print(
+                    f"{key:<40}{result['rows_per_second']:>12.0f}{1e3 * result['p50']:>10.1f}"
+                    f"{1e3 * result['p99']:>10.1f}{result['peak_rss_mib']:>10.0f}{comparison:>10}"
+                )
+
+    if args.save:
+        with open(args.baseline, "w") as f:
+            json.dump({**baseline, **results}, f, indent=2, sort_keys=True)
+
+    if any(regressions):
+        print(f"Regressed by more than {100 * args.tolerance:.0f}%: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 100000])
+    parser.add_argument("--cases", nargs="+", choices=CASES, default=list(CASES))
+    parser.add_argument("--relations", choices=("with", "without", "both"), default="both")
+    parser.add_argument("--batch", type=int, default=1000, help="The number of rows per request")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    parser.add_argument("--save", action="store_true", help="Stores the results as the baseline")
+    parser.add_argument("--run-case", choices=CASES, help=argparse.SUPPRESS)
+    parser.add_argument("--with-relations", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        print(json.dumps(run_case(args.run_case, args.rows[0], args.with_relations, args.batch)))
+    else:
+        main(args)
@@ -20,12 +20,12 @@ def init_app():
 
     logger = make_base_logger(__name__)
 
+    # NB: The schemas are generated on the first request to each endpoint
     for base in AutoMarshmallowSchema.get_subclasses(Base):
-        s = AutoMarshmallowSchema.generate_schema(base)
-        endpoint = Client.make_endpoint(s)
+        endpoint = Client.make_endpoint(base)
 
         logger.info(f"Registering '{endpoint}'")
-        app.add_route(f"/{endpoint}", DatabaseResource.make_endpoint(s, Session, create_ignore=["id"]))
+        app.add_route(f"/{endpoint}", DatabaseResource.make_endpoint(base, Session, create_ignore=["id"]))
 
     logger.info("Successfully registered all views")
     logger.info(f"Registered routes: {', '.join(r.path for r in app.routes)}")
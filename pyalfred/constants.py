@@ -1,3 +1,21 @@
 CHUNK_SIZE = 9999
 INTERFACE_CHUNK_SIZE = 9999
 STRING_SYMBOL = '"'
+THREAD_LIMIT = 10
+STREAM_CHUNK_SIZE = 1000
+PAGE_SIZE = 1000
+NEXT_PAGE_HEADER = "X-Next-Page"
+CLIENT_POOL_SIZE = 10
+CLIENT_RETRIES = 3
+CLIENT_TIMEOUT = 60.0
+MAX_IN_FLIGHT = 4
+CACHE_SIZE = 1024
+FILTER_CACHE_SIZE = 512
+AGGREGATES = ("sum", "min", "max", "avg")
+COMPRESSION_MIN_SIZE = 1024
+BATCH_ENDPOINT = "_batch"
+BATCH_REFERENCE = "$ref"
+WRITE_COOKIE = "pyalfred_last_write"
+UNMATCHED_ROUTE = "<unmatched>"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SCHEMA_CACHE_SIZE = 1024
@@ -1,2 +1,4 @@
 from .base import BaseClient
-from .database import Client
+from .database import Client, Changes
+from .asynchronous import AsyncClient
+from .batch import Batch, Reference
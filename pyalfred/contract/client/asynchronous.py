@@ -0,0 +1,200 @@
+import asyncio
+from typing import Callable, Type, TypeVar, List, Union, Dict, Any, Awaitable
+import httpx
+from auto_schema import AutoMarshmallowSchema
+from ..utils import chunk, serialize, get_columns_in_base_mixin, get_primary_keys
+from ...constants import INTERFACE_CHUNK_SIZE, CLIENT_POOL_SIZE, CLIENT_RETRIES, CLIENT_TIMEOUT, MAX_IN_FLIGHT
+from ..formats import get_format, make_accept_header
+from .database import Client, decorator
+
+
+T = TypeVar("T")
+
+
+class AsyncClient(object):
+    def __init__(
+        self,
+        base_url: str,
+        mixin_ignore: Type[object] = None,
+        max_in_flight: int = MAX_IN_FLIGHT,
+        pool_size: int = CLIENT_POOL_SIZE,
+        retries: int = CLIENT_RETRIES,
+        timeout: float = CLIENT_TIMEOUT,
+        formats: List[str] = None,
+    ):
+        """
+        Asynchronous counterpart of `Client`, sending the chunks of a call concurrently.
+        :param base_url: The base address of the server
+        :param mixin_ignore: If you have a mixin whose columns you wish to ignore when creating.
+        :param max_in_flight: The maximum number of concurrent chunk requests per call
+        :param pool_size: The maximum number of connections to the server
+        :param retries: The number of times to retry on connection errors
+        :param timeout: The timeout in seconds of each request
+        :param formats: The media types to accept in responses in order of preference, defaults to all supported formats
+        except Arrow
+        """
+
+        self._base = base_url if not base_url.endswith("/") else base_url[:-1]
+        self._max_in_flight = max_in_flight
+
+        self._load_only = list()
+        if mixin_ignore is not None:
+            self._load_only = get_columns_in_base_mixin(mixin_ignore)
+
+        limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        transport = httpx.AsyncHTTPTransport(retries=retries, limits=limits)
+        headers = {"Accept": make_accept_header(formats)}
+        self._client = httpx.AsyncClient(base_url=self._base, transport=transport, timeout=timeout, headers=headers)
+
+    async def close(self):
+        await self._client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    def _load_only_fields(self, load_only, schema):
+        res = load_only if any(load_only) else self._load_only
+        return res + getattr(schema, "load_only_fields", [])
+
+    @staticmethod
+    def _decode(resp: httpx.Response) -> Any:
+        return get_format(resp.headers.get("Content-Type")).decode(resp.content)
+
+    async def _send(self, method: str, endpoint: str, params: Dict[str, Any] = None, **kwargs) -> httpx.Response:
+        params = {k: v for k, v in (params or dict()).items() if v is not None}
+        resp = await self._client.request(method, f"/{endpoint}", params=params, **kwargs)
+
+        if resp.status_code != 200:
+            raise Exception(f"Got error code {resp.status_code}: {resp.text}")
+
+        return resp
+
+    async def _map_chunks(self, objects: List[T], f: Callable[[List[T]], Awaitable[List[Any]]]) -> List[Any]:
+        """
+        Applies `f` to each chunk of `objects` with at most `max_in_flight` chunks in flight, and reassembles the
+        results in the order of `objects`.
+        """
+
+        semaphore = asyncio.Semaphore(self._max_in_flight)
+
+        async def run(c):
+            async with semaphore:
+                return await f(c)
+
+        results = await asyncio.gather(*(run(c) for c in chunk(objects, INTERFACE_CHUNK_SIZE)))
+
+        return [r for res in results for r in res]
+
+    async def _send_objects(
+        self,
+        method: str,
+        objects: List[T],
+        load_only: List[str] = None,
+        only: List[str] = None,
+        keys_only: bool = False,
+        **params,
+    ) -> List[T]:
+        schema = AutoMarshmallowSchema.get_schema(type(objects[0]))
+        endpoint = Client.make_endpoint(schema)
+
+        async def send(c):
+            # NB: Serialization and deserialization run in threads so that the event loop keeps uploading other chunks
+            dump = await asyncio.to_thread(serialize, c, schema, load_only=load_only or [], only=only, many=True)
+            resp = await self._send(method, endpoint, params=params, json=dump)
+
+            if keys_only:
+                return Client._set_keys(c, schema, self._decode(resp))
+
+            # NB: Schemas keep state while loading, so each chunk is loaded by an instance of its own
+            return await asyncio.to_thread(lambda: schema(many=True).load_instance(self._decode(resp)))
+
+        return await self._map_chunks(objects, send)
+
+    @decorator
+    async def create(self, objects: Union[T, List[T]], load_only=None, batched=False, bulk=False) -> Union[T, List[T]]:
+        """
+        Create an object of type specified by Meta object in `schema`.
+        :return: An object of type specified by Meta object in `schema`
+        """
+
+        schema = AutoMarshmallowSchema.get_schema(type(objects[0]))
+        load_only_ = self._load_only_fields(load_only or list(), schema)
+
+        res = await self._send_objects(
+            "put", objects, load_only=load_only_, keys_only=bulk and batched, batched=batched, bulk=bulk
+        )
+
+        if any(res) and len(res) < 2:
+            return res[0]
+
+        return res
+
+    async def get(
+        self,
+        objtype: Type[T],
+        f: Callable[[T], bool] = None,
+        one=False,
+        operations: str = None,
+        fields: List[str] = None,
+    ) -> Union[T, List[T], None]:
+        """
+        Get an object of type specified by Meta object in `schema`.
+        :param objtype: The object type to get
+        :param f: Function for designing a filter
+        :param one: Whether to get only one
+        :param operations: Whether to apply any special operations
+        :param fields: If passed, only selects and returns these fields together with the primary key(s)
+        :return: The object of type specified by Meta object in `schema`, or all
+        """
+
+        schema = AutoMarshmallowSchema.get_schema(objtype)
+        fields, init_schema = Client._make_fields(schema, fields)
+        params = {"filter": Client._make_filter(schema, f), "ops": operations, "fields": fields}
+
+        resp = await self._send("get", Client.make_endpoint(schema), params=params)
+        res = await asyncio.to_thread(lambda: init_schema.load_instance(self._decode(resp)))
+
+        if not one:
+            return res
+
+        if len(res) > 1:
+            raise ValueError("More than 1 elements exist!")
+
+        return next(iter(res), None)
+
+    @decorator
+    async def delete(self, objects: Union[T, List[T]]) -> int:
+        """
+        Deletes objects of type specified by Meta object in `schema`, sending the chunks concurrently.
+        :return: The number of affected items
+        """
+
+        schema = AutoMarshmallowSchema.get_schema(type(objects[0]))
+        endpoint = Client.make_endpoint(schema)
+        primary_keys = get_primary_keys(schema.Meta.model)
+
+        async def send(c):
+            dump = serialize(c, schema, many=True, only=primary_keys)
+            resp = await self._send("delete", endpoint, json=dump)
+
+            return [self._decode(resp)["deleted"]]
+
+        return sum(await self._map_chunks(objects, send))
+
+    @decorator
+    async def update(self, objects: Union[T, List[T]], batched=False, bulk=False, only: List[str] = None) -> List[T]:
+        """
+        Updates an object with the new values.
+        :param bulk: Whether to use the set based bulk update path of the server
+        :param only: If passed, only sends these fields together with the primary key(s), i.e. a sparse update
+        :return: The update object
+        """
+
+        if only is not None:
+            schema = AutoMarshmallowSchema.get_schema(type(objects[0]))
+            only = list(set(only) | set(get_primary_keys(schema.Meta.model)))
+
+        return await self._send_objects("patch", objects, only=only, batched=batched, bulk=bulk)
@@ -1,16 +1,53 @@
-from typing import Dict, Any, TypeVar, Type
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, Any, TypeVar, Type, List, Optional, Tuple
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from ...constants import CLIENT_POOL_SIZE, CLIENT_RETRIES, CLIENT_TIMEOUT, NEXT_PAGE_HEADER
+from ..formats import get_format, make_accept_header
 
 
 T = TypeVar("T", bound=requests.Request)
 
 
+def decorator(f):
+    def wrapper(self, objs: T or List[T], **kwargs):
+        if not isinstance(objs, (list, tuple)):
+            objs = [objs]
+
+        if any(not isinstance(o, objs[0].__class__) for o in objs):
+            raise ValueError()
+
+        return f(self, objs, **kwargs)
+
+    return wrapper
+
+
 class BaseClient(object):
-    def __init__(self, base_url: str, endpoint: str = ""):
+    def __init__(
+        self,
+        base_url: str,
+        endpoint: str = "",
+        pool_size: int = CLIENT_POOL_SIZE,
+        retries: int = CLIENT_RETRIES,
+        timeout: float = CLIENT_TIMEOUT,
+        formats: List[str] = None,
+        cache_max_bytes: int = 0,
+    ):
         """
         Defines a base class for interfaces.
         :param base_url: The base address of the server
         :param endpoint: The endpoint of the server
+        :param pool_size: The maximum number of kept alive connections to the server
+        :param retries: The number of times to retry on connection errors, and for idempotent requests on 429 and
+        502-504 after the `Retry-After` of the response, if any
+        :param timeout: The timeout in seconds of each request
+        :param formats: The media types to accept in responses in order of preference, defaults to all supported formats
+        except Arrow
+        :param cache_max_bytes: The maximum total size in bytes of the tagged GET responses to keep, which are
+        revalidated with the server via `If-None-Match` instead of being transferred again. Pages with continuations
+        are never kept. Defaults to 0, i.e. disabled
         """
 
         self._base = base_url if not base_url.endswith("/") else base_url[:-1]
@@ -21,22 +58,106 @@ class BaseClient(object):
         self._ep = endpoint
         self._headers = {"Content-type": "application/json"}
 
+        self._timeout = timeout
+        self._session = self._make_session(pool_size, retries)
+        self._session.headers["Accept"] = make_accept_header(formats)
+
+        self._cache_max_bytes = cache_max_bytes
+        self._cache_bytes = 0
+        self._cache = OrderedDict()
+        self._cache_lock = Lock()
+
+    @staticmethod
+    def _make_session(pool_size: int, retries: int) -> requests.Session:
+        retry = Retry(
+            total=retries,
+            backoff_factor=0.1,
+            status_forcelist=(429, 502, 503, 504),
+            allowed_methods=frozenset({"GET", "HEAD", "DELETE"}),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+
+        return session
+
+    def close(self):
+        self._session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
     def url(self, endpoint: str = None):
         return f"{self._base}/{endpoint or self._ep}"
 
     def _make_request(self, meth, endpoint: str = None, req_type: Type[T] = requests.Request, **kwargs) -> T:
         return req_type(meth, url=self.url(endpoint), **kwargs)
 
-    @staticmethod
-    def _send_request(request: requests.Request, session: requests.Session = None) -> Dict[str, Any]:
-        with (session or requests.Session()) as s:
-            prepared = s.prepare_request(request)
-            resp = s.send(prepared)
+    def _get_cached(self, key: Tuple[str, str]) -> Optional[requests.Response]:
+        with self._cache_lock:
+            resp = self._cache.get(key)
 
-            if resp.status_code != 200:
-                raise Exception(f"Got error code {resp.status_code}: {resp.text}")
+            if resp is not None:
+                self._cache.move_to_end(key)
+
+            return resp
+
+    def _set_cached(self, key: Tuple[str, str], resp: requests.Response):
+        size = len(resp.content)
+        if size > self._cache_max_bytes:
+            return
+
+        with self._cache_lock:
+            previous = self._cache.pop(key, None)
+            if previous is not None:
+                self._cache_bytes -= len(previous.content)
+
+            self._cache[key] = resp
+            self._cache_bytes += size
+
+            while self._cache_bytes > self._cache_max_bytes:
+                _, evicted = self._cache.popitem(last=False)
+                self._cache_bytes -= len(evicted.content)
+
+    def _send(self, request: requests.Request, session: requests.Session = None) -> requests.Response:
+        s = session or self._session
+
+        prepared = s.prepare_request(request)
+
+        key = cached = None
+        if prepared.method == "GET" and self._cache_max_bytes > 0:
+            key = (prepared.url, prepared.headers.get("Accept"))
+            cached = self._get_cached(key)
+
+            if cached is not None:
+                prepared.headers["If-None-Match"] = cached.headers["ETag"]
+
+        resp = s.send(prepared, timeout=self._timeout)
+
+        if resp.status_code == 304 and cached is not None:
+            return cached
+
+        if resp.status_code != 200:
+            raise Exception(f"Got error code {resp.status_code}: {resp.text}")
+
+        # NB: Pages are fetched once while iterating, so keeping them would only grow the memory of the client
+        if key is not None and "ETag" in resp.headers and NEXT_PAGE_HEADER not in resp.headers:
+            self._set_cached(key, resp)
+
+        return resp
+
+    @staticmethod
+    def _decode(resp: requests.Response) -> Any:
+        return get_format(resp.headers.get("Content-Type")).decode(resp.content)
 
-            return resp.json()
+    def _send_request(self, request: requests.Request, session: requests.Session = None) -> Dict[str, Any]:
+        return self._decode(self._send(request, session))
 
     def add_header(self, key: str, value: str):
         self._headers[key] = value
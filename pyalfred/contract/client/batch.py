@@ -0,0 +1,189 @@
+from typing import List, Dict, Any, TypeVar, Union, Type
+from auto_schema import AutoMarshmallowSchema
+from ..utils import serialize, get_primary_keys
+from ...constants import BATCH_REFERENCE, BATCH_ENDPOINT
+from .base import decorator
+
+
+T = TypeVar("T")
+
+
+class Reference(object):
+    def __init__(self, operation: int, index: int, attribute: str):
+        """
+        Placeholder for the value of `attribute` of the `index`:th object of an earlier operation in the same batch,
+        resolved by the server once that object has been flushed.
+        """
+
+        self.operation = operation
+        self.index = index
+        self.attribute = attribute
+
+    def dump(self) -> Dict[str, list]:
+        return {BATCH_REFERENCE: [self.operation, self.index, self.attribute]}
+
+
+class BatchOperation(object):
+    def __init__(self, index: int, op: str, objects: List[T], schema: Type[AutoMarshmallowSchema], batched: bool):
+        """
+        An operation of a batch, whose objects may be referenced by later operations.
+        """
+
+        self.index = index
+        self.op = op
+        self.objects = objects
+        self.schema = schema
+        self.batched = batched
+
+    def ref(self, index: int = 0, attribute: str = None) -> Reference:
+        """
+        Returns a reference to `attribute` of the `index`:th object of the operation, to assign to the attributes of
+        objects of later operations.
+        :param index: The index of the object
+        :param attribute: The attribute to reference, defaults to the primary key
+        """
+
+        if attribute is None:
+            primary_keys = get_primary_keys(self.schema.Meta.model)
+
+            if len(primary_keys) > 1:
+                raise ValueError("The attribute must be specified for models with composite primary keys!")
+
+            attribute = primary_keys[0]
+
+        return Reference(self.index, index, attribute)
+
+
+class Batch(object):
+    def __init__(self, client, endpoint: str = BATCH_ENDPOINT):
+        """
+        Collects create, update and delete operations across models, which are sent in a single request and committed
+        in a single transaction by `commit`. May be used as a context manager, committing on exit if no exception was
+        raised.
+        :param client: The `Client` to send the batch with
+        :param endpoint: The endpoint of the `BatchResource` on the server
+        """
+
+        self._client = client
+        self._endpoint = endpoint
+
+        self._operations = list()
+        self._payload = list()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.commit()
+
+    @staticmethod
+    def _dump(objects: List[T], schema: Type[AutoMarshmallowSchema], **kwargs) -> List[Dict[str, Any]]:
+        """
+        Dumps `objects`, replacing attributes set to a `Reference` by their placeholders.
+        """
+
+        references = list()
+        for obj in objects:
+            refs = {k: v for k, v in vars(obj).items() if isinstance(v, Reference)}
+            references.append(refs)
+
+            for k in refs:
+                setattr(obj, k, None)
+
+        try:
+            dump = serialize(objects, schema, many=True, **kwargs)
+        finally:
+            for obj, refs in zip(objects, references):
+                for k, v in refs.items():
+                    setattr(obj, k, v)
+
+        for d, refs in zip(dump, references):
+            d.update({k: v.dump() for k, v in refs.items() if k in d})
+
+        return dump
+
+    def _add(self, op: str, objects: List[T], batched: bool, **kwargs) -> BatchOperation:
+        schema = AutoMarshmallowSchema.get_schema(type(objects[0]))
+        operation = BatchOperation(len(self._operations), op, objects, schema, batched)
+
+        self._operations.append(operation)
+        self._payload.append(
+            {
+                "op": op,
+                "model": schema.Meta.model.__tablename__,
+                "data": self._dump(objects, schema, **kwargs),
+                "batched": batched,
+            }
+        )
+
+        return operation
+
+    @decorator
+    def create(self, objects: Union[T, List[T]], load_only: List[str] = None, batched=False) -> BatchOperation:
+        """
+        Adds the creation of `objects` to the batch.
+        :param batched: Whether to only return the primary keys of the objects, which are then set on `objects`
+        :return: The operation, via which later operations may reference the created objects
+        """
+
+        schema = AutoMarshmallowSchema.get_schema(type(objects[0]))
+        load_only_ = self._client._load_only_fields(load_only or list(), schema)
+
+        return self._add("create", objects, batched, load_only=load_only_)
+
+    @decorator
+    def update(self, objects: Union[T, List[T]], only: List[str] = None, batched=False) -> BatchOperation:
+        """
+        Adds the update of `objects` to the batch.
+        :param only: If passed, only sends these fields together with the primary key(s), i.e. a sparse update
+        :param batched: Whether to only return the primary keys of the objects
+        """
+
+        if only is not None:
+            model = AutoMarshmallowSchema.get_schema(type(objects[0])).Meta.model
+            only = list(set(only) | set(get_primary_keys(model)))
+
+        return self._add("update", objects, batched, only=only)
+
+    @decorator
+    def delete(self, objects: Union[T, List[T]]) -> BatchOperation:
+        """
+        Adds the deletion of `objects` to the batch.
+        """
+
+        model = AutoMarshmallowSchema.get_schema(type(objects[0])).Meta.model
+        return self._add("delete", objects, False, only=get_primary_keys(model))
+
+    def commit(self) -> List[Union[List[T], int]]:
+        """
+        Sends the operations of the batch, which are run in order and committed in a single transaction.
+        :return: For each operation, the created or updated objects, or the number of deleted objects
+        """
+
+        if not self._operations:
+            return list()
+
+        req = self._client._make_request("post", self._endpoint, json=self._payload)
+        response = self._client._send_request(req)
+
+        results = list()
+        for operation, result in zip(self._operations, response):
+            if operation.op == "delete":
+                results.append(result["deleted"])
+            elif operation.batched:
+                results.append(self._client._set_keys(operation.objects, operation.schema, result))
+            else:
+                results.append(operation.schema(many=True).load_instance(result))
+
+        # NB: Replaces the references on the objects passed with the values they resolved to
+        for operation in self._operations:
+            for obj in operation.objects:
+                for k, v in list(vars(obj).items()):
+                    if isinstance(v, Reference):
+                        setattr(obj, k, getattr(results[v.operation][v.index], v.attribute))
+
+        self._operations.clear()
+        self._payload.clear()
+
+        return results
@@ -1,51 +1,91 @@
-from typing import Callable, Type, TypeVar, List, Union
+from collections import namedtuple
+from typing import Callable, Type, TypeVar, List, Union, Iterator, Tuple, Optional, Dict, Any
 from query_serializer import QueryBuilder
-from ..utils import chunk, serialize, get_columns_in_base_mixin
+from ..utils import chunk, serialize, get_columns_in_base_mixin, get_primary_keys
+from ..schemas import get_schema_instance, get_schema_name
 from auto_schema import AutoMarshmallowSchema
-from ...constants import INTERFACE_CHUNK_SIZE
-from .base import BaseClient
+from ...constants import INTERFACE_CHUNK_SIZE, NEXT_PAGE_HEADER, PAGE_SIZE, AGGREGATES, BATCH_ENDPOINT
+from .base import BaseClient, decorator
+from .batch import Batch
 
 
 T = TypeVar("T")
 
-
-def decorator(f):
-    def wrapper(self, objs: T or List[T], **kwargs):
-        if not isinstance(objs, (list, tuple)):
-            objs = [objs]
-
-        if any(not isinstance(o, objs[0].__class__) for o in objs):
-            raise ValueError()
-
-        return f(self, objs, **kwargs)
-
-    return wrapper
+Changes = namedtuple("Changes", ["seq", "upserted", "deleted"])
 
 
 class Client(BaseClient):
-    def __init__(self, base_url, mixin_ignore: Type[object] = None):
+    def __init__(self, base_url, mixin_ignore: Type[object] = None, **kwargs):
         """
         An interface for defining and creating.
         :param mixin_ignore: If you have a mixin whose columns you wish to ignore when creating.
+        :param kwargs: Any keyworded arguments passed to `BaseClient`
         """
-        super().__init__(base_url)
+        super().__init__(base_url, **kwargs)
 
         self._load_only = list()
         if mixin_ignore is not None:
             self._load_only = get_columns_in_base_mixin(mixin_ignore)
 
     @classmethod
-    def make_endpoint(cls, schema: Type[AutoMarshmallowSchema]) -> str:
-        return schema.__name__.lower().replace("schema", "")
+    def make_endpoint(cls, schema: Union[Type[AutoMarshmallowSchema], Type[object]]) -> str:
+        """
+        Returns the endpoint of `schema`, or of the schema generated for a model.
+        """
+
+        return get_schema_name(schema).lower().replace("schema", "")
+
+    def batch(self, endpoint: str = BATCH_ENDPOINT) -> Batch:
+        """
+        Starts a batch of create, update and delete operations across models, committed in a single transaction.
+        :param endpoint: The endpoint of the `BatchResource` on the server
+        """
+
+        return Batch(self, endpoint)
+
+    @staticmethod
+    def _make_filter(schema: Type[AutoMarshmallowSchema], f: Callable[[T], bool] = None) -> Union[str, None]:
+        if f is None:
+            return None
+
+        fb = QueryBuilder(schema.Meta.model)
+        return fb.to_string(f(schema.Meta.model))
+
+    @staticmethod
+    def _make_fields(
+        schema: Type[AutoMarshmallowSchema], fields: List[str] = None
+    ) -> Tuple[Optional[str], AutoMarshmallowSchema]:
+        """
+        Returns the `fields` parameter of a request together with a schema for loading the projected objects.
+        """
+
+        if fields is None:
+            return None, schema(many=True)
+
+        only = list(dict.fromkeys(get_primary_keys(schema.Meta.model) + list(fields)))
+
+        return ",".join(only), schema(many=True, only=only, partial=True)
+
+    @staticmethod
+    def _set_keys(objects: List[T], schema: Type[AutoMarshmallowSchema], keys: List[dict]) -> List[T]:
+        fields = get_schema_instance(schema).fields
+
+        for obj, key in zip(objects, keys):
+            for k, v in key.items():
+                setattr(obj, k, fields[k].deserialize(v, k, key))
+
+        return objects
 
     def _load_only_fields(self, load_only, schema):
         res = load_only if any(load_only) else self._load_only
         return res + getattr(schema, "load_only_fields", [])
 
     @decorator
-    def create(self, objects: Union[T, List[T]], load_only=None, batched=False) -> Union[T, List[T]]:
+    def create(self, objects: Union[T, List[T]], load_only=None, batched=False, bulk=False) -> Union[T, List[T]]:
         """
         Create an object of type specified by Meta object in `schema`.
+        :param bulk: Whether to use the bulk insert path of the server, bypassing the ORM. If combined with `batched`
+        only the generated keys are returned by the server, which are then set on `objects`.
         :return: An object of type specified by Meta object in `schema`
         """
 
@@ -59,16 +99,58 @@ class Client(BaseClient):
 
         for c in chunk(objects, INTERFACE_CHUNK_SIZE):
             dump = serialize(c, schema, load_only=load_only_, many=True)
-            req = self._make_request("put", endpoint, json=dump, params={"batched": batched})
-            res.extend(init_schema.load_instance(self._send_request(req)))
+            req = self._make_request("put", endpoint, json=dump, params={"batched": batched, "bulk": bulk})
+            resp = self._send_request(req)
+
+            if bulk and batched:
+                res.extend(self._set_keys(c, schema, resp))
+            else:
+                res.extend(init_schema.load_instance(resp))
 
         if any(res) and len(res) < 2:
             return res[0]
 
         return res
 
+    @decorator
+    def upsert(self, objects: Union[T, List[T]], conflict: List[str] = None, load_only=None, batched=False) -> List[T]:
+        """
+        Creates objects of type specified by Meta object in `schema`, or updates the existing ones if conflicting.
+        :param conflict: The attributes on which to detect conflicts, defaults to the primary key(s) on the server
+        :param batched: Whether to only return the primary keys of the objects, which are then set on `objects`
+        :return: The created or updated objects
+        """
+
+        res = list()
+        schema = AutoMarshmallowSchema.get_schema(type(objects[0]))
+
+        # NB: The conflict columns are always sent, as the server detects conflicts on them
+        keep = conflict or get_primary_keys(schema.Meta.model)
+        load_only_ = [f for f in self._load_only_fields(load_only or list(), schema) if f not in keep]
+
+        endpoint = self.make_endpoint(schema)
+        params = {"batched": batched, "upsert": True, "conflict": ",".join(conflict or [])}
+
+        init_schema = schema(many=True)
+
+        for c in chunk(objects, INTERFACE_CHUNK_SIZE):
+            dump = serialize(c, schema, load_only=load_only_, many=True)
+            resp = self._send_request(self._make_request("put", endpoint, json=dump, params=params))
+
+            if batched:
+                res.extend(self._set_keys(c, schema, resp))
+            else:
+                res.extend(init_schema.load_instance(resp))
+
+        return res
+
     def get(
-        self, objtype: Type[T], f: Callable[[T], bool] = None, one=False, operations: str = None
+        self,
+        objtype: Type[T],
+        f: Callable[[T], bool] = None,
+        one=False,
+        operations: str = None,
+        fields: List[str] = None,
     ) -> Union[T, List[T], None]:
         """
         Get an object of type specified by Meta object in `schema`.
@@ -76,18 +158,15 @@ class Client(BaseClient):
         :param f: Function for designing a filter
         :param one: Whether to get only one
         :param operations: Whether to apply any special operations
+        :param fields: If passed, only selects and returns these fields together with the primary key(s)
         :return: The object of type specified by Meta object in `schema`, or all
         """
 
-        json = None
         schema = AutoMarshmallowSchema.get_schema(objtype)
-        if f:
-            fb = QueryBuilder(schema.Meta.model)
-            json = fb.to_string(f(schema.Meta.model))
-
-        req = self._make_request("get", endpoint=self.make_endpoint(schema), params={"filter": json, "ops": operations})
+        fields, init_schema = self._make_fields(schema, fields)
+        params = {"filter": self._make_filter(schema, f), "ops": operations, "fields": fields}
 
-        init_schema = schema(many=True)
+        req = self._make_request("get", endpoint=self.make_endpoint(schema), params=params)
         res = init_schema.load_instance(self._send_request(req))
 
         if not one:
@@ -98,27 +177,147 @@ class Client(BaseClient):
 
         return next(iter(res), None)
 
+    def iter(
+        self,
+        objtype: Type[T],
+        f: Callable[[T], bool] = None,
+        page_size: int = PAGE_SIZE,
+        operations: str = None,
+        fields: List[str] = None,
+    ) -> Iterator[T]:
+        """
+        Lazily iterates over objects of type specified by Meta object in `schema`, fetching `page_size` objects at a
+        time by following the continuation tokens returned by the server.
+        :param objtype: The object type to get
+        :param f: Function for designing a filter
+        :param page_size: The number of objects to fetch per request
+        :param operations: Whether to apply any special operations, the server rejects `limit` and `first`
+        :param fields: If passed, only selects and returns these fields together with the primary key(s)
+        :return: An iterator over objects of type specified by Meta object in `schema`
+        """
+
+        schema = AutoMarshmallowSchema.get_schema(objtype)
+        endpoint = self.make_endpoint(schema)
+        filter_ = self._make_filter(schema, f)
+
+        fields, init_schema = self._make_fields(schema, fields)
+        token = None
+
+        while True:
+            ops = [operations, f"page {page_size:d}"] + ([f"after {token}"] if token else [])
+            params = {"filter": filter_, "ops": ",".join(o for o in ops if o), "fields": fields}
+
+            resp = self._send(self._make_request("get", endpoint=endpoint, params=params))
+            yield from init_schema.load_instance(self._decode(resp))
+
+            token = resp.headers.get(NEXT_PAGE_HEADER)
+            if token is None:
+                return
+
+    def sync(
+        self, objtype: Type[T], since: int = 0, page_size: int = PAGE_SIZE, fields: List[str] = None
+    ) -> Iterator[Changes]:
+        """
+        Iterates over the changes to objects of type specified by Meta object in `schema` made after the sequence
+        `since`, considering `page_size` changes per request. Requires the endpoint to track changes.
+        :param objtype: The object type to sync
+        :param since: The sequence to continue from, i.e. the `seq` of the last changes received, or 0 for all changes
+        :param page_size: The maximum number of changes per request
+        :param fields: If passed, only selects and returns these fields together with the primary key(s)
+        :return: An iterator over `Changes`, holding the upserted objects, the primary keys of the deleted objects and
+        the sequence to continue from
+        """
+
+        schema = AutoMarshmallowSchema.get_schema(objtype)
+        endpoint = self.make_endpoint(schema)
+        fields, init_schema = self._make_fields(schema, fields)
+
+        while True:
+            params = {"since": since, "page_size": page_size, "fields": fields}
+            resp = self._send_request(self._make_request("get", endpoint=endpoint, params=params))
+
+            since = resp["seq"]
+            yield Changes(since, init_schema.load_instance(resp["upserted"]), resp["deleted"])
+
+            if not resp["more"]:
+                return
+
+    def count(self, objtype: Type[T], f: Callable[[T], bool] = None) -> int:
+        """
+        Counts the objects of type specified by Meta object in `schema` matching the filter, on the server.
+        :param objtype: The object type to count
+        :param f: Function for designing a filter
+        :return: The number of objects
+        """
+
+        return self.aggregate(objtype, f, count=True)[0]["count"]
+
+    def aggregate(
+        self, objtype: Type[T], f: Callable[[T], bool] = None, group_by: List[str] = None, count=False, **aggregates
+    ) -> List[Dict[str, Any]]:
+        """
+        Aggregates the objects of type specified by Meta object in `schema` matching the filter, on the server.
+        :param objtype: The object type to aggregate
+        :param f: Function for designing a filter
+        :param group_by: The attributes to group on
+        :param count: Whether to count the objects in each group, returned as `count`
+        :param aggregates: Any of `sum`, `min`, `max` or `avg` together with a list of attributes to aggregate, each
+        returned as `<aggregate>_<attribute>`. E.g. `sum=["amount"]` returns `sum_amount`
+        :return: A list of dictionaries, one per group
+        """
+
+        unknown = [k for k in aggregates if k not in AGGREGATES]
+        if any(unknown):
+            raise ValueError(f"Unknown aggregates: {', '.join(unknown)}")
+
+        ops = [f"group by {g}" for g in (group_by or [])] + (["count"] if count else [])
+        ops += [f"{k} {a}" for k, v in aggregates.items() for a in v]
+
+        schema = AutoMarshmallowSchema.get_schema(objtype)
+        params = {"filter": self._make_filter(schema, f), "ops": ",".join(ops)}
+
+        return self._send_request(self._make_request("get", endpoint=self.make_endpoint(schema), params=params))
+
     @decorator
     def delete(self, objects: Union[T, List[T]]) -> int:
         """
-        Deletes an object with `id_` of type specified by Meta object in `schema`.
+        Deletes objects of type specified by Meta object in `schema`, sending one request per chunk of objects.
         :return: The number of affected items
         """
 
         deleted = 0
         schema = AutoMarshmallowSchema.get_schema(type(objects[0]))
         endpoint = self.make_endpoint(schema)
-        for obj in objects:
-            req = self._make_request("delete", endpoint=endpoint, params={"id": obj.id})
+        primary_keys = get_primary_keys(schema.Meta.model)
+
+        for c in chunk(objects, INTERFACE_CHUNK_SIZE):
+            dump = serialize(c, schema, many=True, only=primary_keys)
+            req = self._make_request("delete", endpoint=endpoint, json=dump)
             resp = self._send_request(req)
             deleted += resp["deleted"]
 
         return deleted
 
+    def delete_where(self, objtype: Type[T], f: Callable[[T], bool]) -> int:
+        """
+        Deletes all objects of type specified by Meta object in `schema` matching the filter.
+        :param objtype: The object type to delete
+        :param f: Function for designing a filter
+        :return: The number of affected items
+        """
+
+        schema = AutoMarshmallowSchema.get_schema(objtype)
+        params = {"filter": self._make_filter(schema, f)}
+        req = self._make_request("delete", endpoint=self.make_endpoint(schema), params=params)
+
+        return self._send_request(req)["deleted"]
+
     @decorator
-    def update(self, objects: Union[T, List[T]], batched=False) -> List[T]:
+    def update(self, objects: Union[T, List[T]], batched=False, bulk=False, only: List[str] = None) -> List[T]:
         """
         Updates an object with the new values.
+        :param bulk: Whether to use the set based bulk update path of the server
+        :param only: If passed, only sends these fields together with the primary key(s), i.e. a sparse update
         :return: The update object
         """
 
@@ -126,10 +325,13 @@ class Client(BaseClient):
         schema = AutoMarshmallowSchema.get_schema(type(objects[0]))
         endpoint = self.make_endpoint(schema)
 
+        if only is not None:
+            only = list(set(only) | set(get_primary_keys(schema.Meta.model)))
+
         init_schema = schema(many=True)
         for c in chunk(objects, INTERFACE_CHUNK_SIZE):
-            dump = serialize(c, schema, many=True)
-            req = self._make_request("patch", endpoint, json=dump, params={"batched": batched})
+            dump = serialize(c, schema, many=True, only=only)
+            req = self._make_request("patch", endpoint, json=dump, params={"batched": batched, "bulk": bulk})
             res.extend(init_schema.load_instance(self._send_request(req)))
 
         return res
@@ -0,0 +1,127 @@
+import json
+from collections import OrderedDict
+from typing import Any, List
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+except ImportError:
+    pyarrow = None
+
+
+class Format(object):
+    media_type = None
+    tabular = False
+
+    def encode(self, media: Any) -> bytes:
+        raise NotImplementedError()
+
+    def decode(self, content: bytes) -> Any:
+        raise NotImplementedError()
+
+
+class JSONFormat(Format):
+    media_type = "application/json"
+
+    def encode(self, media: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(media)
+
+        return json.dumps(media, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+    def decode(self, content: bytes) -> Any:
+        if orjson is not None:
+            return orjson.loads(content)
+
+        return json.loads(content)
+
+
+class MsgPackFormat(Format):
+    media_type = "application/msgpack"
+
+    def encode(self, media: Any) -> bytes:
+        return msgpack.packb(media, use_bin_type=True)
+
+    def decode(self, content: bytes) -> Any:
+        return msgpack.unpackb(content, raw=False)
+
+
+class ArrowFormat(Format):
+    media_type = "application/vnd.apache.arrow.stream"
+    tabular = True
+
+    def encode(self, media: List[dict]) -> bytes:
+        table = pyarrow.Table.from_pylist(media)
+        sink = pyarrow.BufferOutputStream()
+
+        with pyarrow.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+
+        return sink.getvalue().to_pybytes()
+
+    def decode(self, content: bytes) -> List[dict]:
+        return pyarrow.ipc.open_stream(content).read_all().to_pylist()
+
+
+JSON = JSONFormat()
+
+# NB: Ordered by preference, only including the formats whose dependencies are installed
+FORMATS = OrderedDict(
+    (f.media_type, f)
+    for f, available in ((MsgPackFormat(), msgpack is not None), (JSON, True), (ArrowFormat(), pyarrow is not None))
+    if available
+)
+
+
+def negotiate_format(accept: str = None) -> Format:
+    """
+    Selects the format with the highest quality in the `Accept` header that is supported, defaulting to JSON.
+    """
+
+    candidates = list()
+    for i, part in enumerate((accept or "").split(",")):
+        media_type, *parameters = [p.strip() for p in part.split(";")]
+
+        quality = 1.0
+        for p in parameters:
+            if p.startswith("q="):
+                try:
+                    quality = float(p[2:])
+                except ValueError:
+                    quality = 0.0
+
+        # NB: A quality of zero marks the media type as not acceptable
+        if quality > 0.0:
+            candidates.append((-quality, i, media_type))
+
+    for _, _, media_type in sorted(candidates):
+        if media_type in FORMATS:
+            return FORMATS[media_type]
+
+    return JSON
+
+
+def get_format(content_type: str = None) -> Format:
+    media_type = (content_type or "").split(";")[0].strip()
+    return FORMATS.get(media_type, JSON)
+
+
+def make_accept_header(media_types: List[str] = None) -> str:
+    """
+    Creates an `Accept` header listing `media_types`, or all supported formats except Arrow, in order of preference.
+    """
+
+    media_types = media_types or [m for m in FORMATS if m != ArrowFormat.media_type]
+    n = len(media_types)
+
+    return ", ".join(f"{m};q={1.0 - i / (n + 1):.2f}" for i, m in enumerate(media_types))
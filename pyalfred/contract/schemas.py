@@ -0,0 +1,165 @@
+from functools import lru_cache
+from threading import Lock
+from typing import Type, Dict, Any, Callable, Optional, Tuple
+from marshmallow import Schema, fields
+from auto_schema import AutoMarshmallowSchema
+from ..constants import SCHEMA_CACHE_SIZE
+
+
+# NB: Fields whose dump only converts the value of a column, i.e. needs neither the session nor other schemas
+PLAIN_FIELDS = (
+    fields.Number,
+    fields.String,
+    fields.Boolean,
+    fields.DateTime,
+    fields.Date,
+    fields.Time,
+    fields.TimeDelta,
+    fields.UUID,
+    fields.Enum,
+    fields.Raw,
+)
+
+
+def is_schema(obj) -> bool:
+    return isinstance(obj, type) and issubclass(obj, Schema)
+
+
+def get_schema_name(schema: Type[object]) -> str:
+    """
+    Returns the name of `schema`, or of the schema generated for `schema` if a model, without generating it.
+    """
+
+    return schema.__name__ if is_schema(schema) else f"{schema.__name__}Schema"
+
+
+def _freeze(value):
+    if isinstance(value, list):
+        return tuple(value)
+
+    if isinstance(value, set):
+        return frozenset(value)
+
+    return value
+
+
+def _make_key(options: Dict[str, Any]) -> Optional[Tuple[Tuple[str, Any], ...]]:
+    key = tuple(sorted((k, _freeze(v)) for k, v in options.items()))
+
+    try:
+        hash(key)
+    except TypeError:
+        return None
+
+    return key
+
+
+def get_schema_instance(schema: Type[Schema], **options) -> Schema:
+    """
+    Returns the instance of `schema` constructed with `options`, e.g. `many` and `only`, creating it on first use and
+    sharing it with later callers. Only use the instance for dumps and inspecting its fields, as loading sets state on
+    the schema, e.g. the instance and session of marshmallow-sqlalchemy, and so requires an instance of its own.
+    """
+
+    key = _make_key(options)
+    if key is None:
+        return schema(**options)
+
+    return _get_schema_instance(schema, key)
+
+
+@lru_cache(maxsize=SCHEMA_CACHE_SIZE)
+def _get_schema_instance(schema: Type[Schema], options: Tuple[Tuple[str, Any], ...]) -> Schema:
+    return schema(**dict(options))
+
+
+def _has_dump_hooks(instance: Schema) -> bool:
+    # NB: Older versions of marshmallow key the hooks on the tuple of tag and `pass_many`
+    for tag, hooks in instance._hooks.items():
+        tag = tag[0] if isinstance(tag, tuple) else tag
+
+        if tag in ("pre_dump", "post_dump") and any(hooks):
+            return True
+
+    return False
+
+
+def compile_dumper(instance: Schema) -> Optional[Callable[[Any], Dict[str, Any]]]:
+    """
+    Compiles a function dumping a single object like `instance`, reading the attributes directly and applying the
+    conversion of each field, which skips the per-field accessors and defaults of marshmallow. Returns `None` unless
+    all fields dumped are plain columns and the schema has no dump hooks.
+    """
+
+    if _has_dump_hooks(instance):
+        return None
+
+    plan = list()
+    for name, field in instance.dump_fields.items():
+        attribute = field.attribute or name
+
+        if not isinstance(field, PLAIN_FIELDS) or "." in attribute:
+            return None
+
+        plan.append((field.data_key if field.data_key is not None else name, attribute, field._serialize))
+
+    def dump(obj) -> Dict[str, Any]:
+        return {key: serialize_(getattr(obj, attribute), attribute, obj) for key, attribute, serialize_ in plan}
+
+    return dump
+
+
+def get_dumper(schema: Type[Schema], **options) -> Callable[[Any], Any]:
+    """
+    Returns a function equivalent to `get_schema_instance(schema, **options).dump`, which for instances of the model of
+    the schema uses the function of `compile_dumper` where possible.
+    """
+
+    key = _make_key(options)
+    if key is None:
+        return schema(**options).dump
+
+    return _get_dumper(schema, key)
+
+
+@lru_cache(maxsize=SCHEMA_CACHE_SIZE)
+def _get_dumper(schema: Type[Schema], options: Tuple[Tuple[str, Any], ...]) -> Callable[[Any], Any]:
+    instance = _get_schema_instance(schema, options)
+    model = getattr(getattr(schema, "Meta", None), "model", None)
+
+    compiled = compile_dumper(instance) if model is not None else None
+    if compiled is None:
+        return instance.dump
+
+    # NB: Anything but instances of the model, e.g. dictionaries of keys, is left to marshmallow
+    def dump(objects):
+        if not instance.many:
+            return compiled(objects) if isinstance(objects, model) else instance.dump(objects)
+
+        if isinstance(objects, list) and all(isinstance(obj, model) for obj in objects):
+            return [compiled(obj) for obj in objects]
+
+        return instance.dump(objects)
+
+    return dump
+
+
+class LazySchema(object):
+    def __init__(self, model: Type[object]):
+        """
+        Descriptor generating the schema of `model` on first access, such that exposing many models does not generate
+        all of their schemas on start up.
+        :param model: The model to generate the schema of
+        """
+
+        self.model = model
+        self._schema = None
+        self._lock = Lock()
+
+    def __get__(self, instance, owner) -> Type[AutoMarshmallowSchema]:
+        if self._schema is None:
+            with self._lock:
+                if self._schema is None:
+                    self._schema = AutoMarshmallowSchema.generate_schema(self.model)
+
+        return self._schema
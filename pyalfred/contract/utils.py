@@ -1,6 +1,7 @@
 from typing import List, Dict, Any, TypeVar, Type
-from sqlalchemy import Column
+from sqlalchemy import Column, inspect
 from auto_schema import AutoMarshmallowSchema
+from .schemas import get_dumper
 
 T = TypeVar("T")
 
@@ -11,8 +12,13 @@ def chunk(iterable, cs):
 
 
 def serialize(objects: List[T], schema: AutoMarshmallowSchema, **kwargs) -> List[Dict[str, Any]]:
-    return schema(many=kwargs.pop("many", True), **kwargs).dump(objects)
+    return get_dumper(schema, many=kwargs.pop("many", True), **kwargs)(objects)
 
 
 def get_columns_in_base_mixin(obj: Type[object]):
     return [k for (k, v) in vars(obj).items() if isinstance(v, Column)]
+
+
+def get_primary_keys(model) -> List[str]:
+    mapper = inspect(model)
+    return [mapper.get_property_by_column(c).key for c in mapper.primary_key]
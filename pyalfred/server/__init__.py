@@ -1 +1,6 @@
 from .database import DatabaseResource
+from .batch import BatchResource
+from .cache import CacheBackend, MemoryCache, RedisCache
+from .replicas import ReplicaPolicy, RoundRobin, Random, LeastUsed
+from .metrics import Metrics, MetricsMiddleware
+from .admission import AdmissionControl
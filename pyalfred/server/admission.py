@@ -0,0 +1,150 @@
+from collections import deque
+from typing import Optional, Hashable, Callable, Awaitable, Any, Union, Dict
+from anyio import Event, move_on_after
+from starlette.status import HTTP_429_TOO_MANY_REQUESTS, HTTP_503_SERVICE_UNAVAILABLE
+
+
+METHODS = ("GET", "PUT", "PATCH", "DELETE", "POST")
+
+
+class _Call(object):
+    def __init__(self):
+        self.done = Event()
+        self.finished = False
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(object):
+    """
+    Coalesces concurrent calls with equal keys, such that only the first runs while the others await and share its
+    result (or error).
+    """
+
+    def __init__(self):
+        self._calls = dict()
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    async def run(self, key: Hashable, f: Callable[[], Awaitable[Any]]) -> Any:
+        while key in self._calls:
+            call = self._calls[key]
+            await call.done.wait()
+
+            # NB: If the running call was cancelled, e.g. as its client disconnected, the next waiter runs it instead
+            if call.finished:
+                if call.error is not None:
+                    raise call.error
+
+                return call.result
+
+        call = self._calls[key] = _Call()
+
+        try:
+            call.result = await f()
+            call.finished = True
+        except Exception as e:
+            call.error = e
+            call.finished = True
+            raise
+        finally:
+            del self._calls[key]
+            call.done.set()
+
+        return call.result
+
+
+class AdmissionControl(object):
+    def __init__(self, max_concurrency: int, max_queue: int = 0, queue_timeout: float = None, retry_after: int = 1):
+        """
+        Bounds the number of concurrently handled requests, queueing up to `max_queue` further requests in order of
+        arrival. Requests arriving to a full queue are rejected with 429, and requests not admitted within
+        `queue_timeout` with 503, both with a `Retry-After` header.
+        :param max_concurrency: The maximum number of requests handled concurrently
+        :param max_queue: The maximum number of requests waiting to be admitted
+        :param queue_timeout: The maximum number of seconds a request waits to be admitted, defaults to no limit
+        :param retry_after: The number of seconds after which rejected clients should retry
+        """
+
+        if max_concurrency < 1 or max_queue < 0:
+            raise ValueError("`max_concurrency` must be positive and `max_queue` non-negative!")
+
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+
+        self.rejected = 0
+
+        self._active = 0
+        self._waiters = deque()
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> Optional[int]:
+        """
+        Waits for the request to be admitted, returning `None` if it was and otherwise the status to reject it with.
+        Admitted requests must call `release` when done.
+        """
+
+        if self._active < self.max_concurrency and not self._waiters:
+            self._active += 1
+            return None
+
+        if len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            return HTTP_429_TOO_MANY_REQUESTS
+
+        event = Event()
+        self._waiters.append(event)
+
+        try:
+            with move_on_after(self.queue_timeout):
+                await event.wait()
+        except BaseException:
+            # NB: A slot handed over to a cancelled request is passed on
+            if event.is_set():
+                self.release()
+            else:
+                self._waiters.remove(event)
+
+            raise
+
+        if event.is_set():
+            return None
+
+        self._waiters.remove(event)
+        self.rejected += 1
+
+        return HTTP_503_SERVICE_UNAVAILABLE
+
+    def release(self):
+        # NB: The slot is handed over directly to the first waiter, so that arriving requests cannot overtake the queue
+        if self._waiters:
+            self._waiters.popleft().set()
+        else:
+            self._active -= 1
+
+
+def get_admission_controls(
+    admission_control: Union[AdmissionControl, Dict[str, AdmissionControl]] = None
+) -> Dict[str, AdmissionControl]:
+    """
+    Maps the HTTP methods to their admission controls, where a single `AdmissionControl` is shared by all methods.
+    """
+
+    if admission_control is None:
+        return dict()
+
+    if isinstance(admission_control, AdmissionControl):
+        return {m: admission_control for m in METHODS}
+
+    return {m.upper(): a for m, a in admission_control.items()}
@@ -0,0 +1,116 @@
+import time
+from math import ceil
+from typing import Dict
+from functools import partial
+from anyio import to_thread
+from starlette.endpoints import HTTPEndpoint
+from starlette.datastructures import Headers
+from starlette.requests import HTTPConnection
+from starlette.responses import Response, JSONResponse
+from starlette.status import HTTP_200_OK, HTTP_304_NOT_MODIFIED
+from pyalfred.contract.formats import Format, JSON, negotiate_format
+from pyalfred.server.utils import negotiate_encoding, compress
+from pyalfred.server.metrics import phase
+from pyalfred.constants import WRITE_COOKIE
+
+
+class BaseResource(HTTPEndpoint):
+    logger = None
+    limiter = None
+    compression_min_size = None
+    read_your_writes = None
+    admission = None
+
+    async def dispatch(self) -> None:
+        # NB: HEAD requests are served by GET, and thus share its admission control
+        method = self.scope["method"]
+        admission = (self.admission or dict()).get("GET" if method == "HEAD" else method)
+
+        if admission is None:
+            return await super().dispatch()
+
+        status = await admission.acquire()
+        if status is not None:
+            headers = {"Retry-After": f"{admission.retry_after:d}"}
+            response = JSONResponse(f"Too many concurrent {method} requests, retry later", status, headers=headers)
+
+            return await response(self.scope, self.receive, self.send)
+
+        try:
+            await super().dispatch()
+        finally:
+            admission.release()
+
+    @property
+    def format(self) -> Format:
+        """
+        The response format negotiated from the `Accept` header of the request.
+        """
+
+        return negotiate_format(Headers(scope=self.scope).get("accept"))
+
+    def _respond(self, media, status: int, headers: Dict[str, str] = None) -> Response:
+        # NB: Errors are always sent as JSON
+        if status != HTTP_200_OK:
+            return JSONResponse(media, status, headers=headers)
+
+        # NB: Tabular formats only encode lists of records, anything else is sent as JSON
+        format_ = self.format
+        if format_.tabular and not isinstance(media, list):
+            format_ = JSON
+
+        with phase("encode"):
+            content = format_.encode(media)
+
+        return self._make_response(content, format_.media_type, headers)
+
+    def _make_response(self, content: bytes, media_type: str, headers: Dict[str, str] = None) -> Response:
+        """
+        Creates a successful response of the encoded `content`, compressing it if large enough and accepted by the
+        client.
+        """
+
+        headers = {**(headers or dict()), "Vary": "Accept, Accept-Encoding"}
+
+        if self.compression_min_size is not None and len(content) >= self.compression_min_size:
+            encoding = negotiate_encoding(Headers(scope=self.scope).get("accept-encoding"))
+
+            if encoding is not None:
+                with phase("compress"):
+                    content = compress(content, encoding)
+                headers["Content-Encoding"] = encoding
+
+        return Response(content, HTTP_200_OK, headers=headers, media_type=media_type)
+
+    def _not_modified(self, etag: str) -> Response:
+        return Response(status_code=HTTP_304_NOT_MODIFIED, headers={"ETag": etag, "Vary": "Accept, Accept-Encoding"})
+
+    async def _run_in_thread(self, f, *args):
+        """
+        Runs the blocking callable `f` in a worker thread, bounded by the endpoint's limiter. As `f` both creates and
+        removes the session, the thread local `scoped_session` never leaks between requests.
+        """
+
+        return await to_thread.run_sync(partial(f, *args), limiter=self.limiter)
+
+    def _mark_write(self, response: Response) -> Response:
+        """
+        Sets a cookie with the time of a successful write, so that the reads of the client are routed to the primary
+        for the read-your-writes window.
+        """
+
+        if self.read_your_writes is not None and response.status_code == HTTP_200_OK:
+            response.set_cookie(WRITE_COOKIE, f"{time.time():.3f}", max_age=ceil(self.read_your_writes), httponly=True)
+
+        return response
+
+    def _wrote_recently(self) -> bool:
+        if self.read_your_writes is None:
+            return False
+
+        try:
+            written = float(HTTPConnection(self.scope).cookies.get(WRITE_COOKIE, "-inf"))
+        except ValueError:
+            return False
+
+        return time.time() - written < self.read_your_writes
@@ -0,0 +1,171 @@
+from typing import List, Type, Union, Dict, Any
+from logging import Logger
+from anyio import CapacityLimiter
+from sqlalchemy.orm import scoped_session, sessionmaker, Session
+from starlette.requests import Request
+from starlette.status import HTTP_500_INTERNAL_SERVER_ERROR, HTTP_200_OK
+from pyalfred.contract.utils import serialize, get_primary_keys
+from pyalfred.contract.schemas import get_schema_instance
+from pyalfred.server.base import BaseResource
+from pyalfred.server.admission import AdmissionControl, get_admission_controls
+from pyalfred.server.database import DatabaseResource
+from pyalfred.server.utils import make_base_logger
+from pyalfred.constants import THREAD_LIMIT, COMPRESSION_MIN_SIZE, BATCH_REFERENCE
+
+
+OPERATIONS = ("create", "update", "delete")
+
+
+class BatchResource(BaseResource):
+    resources = None
+    session_factory = None
+
+    @classmethod
+    def make_endpoint(
+        cls,
+        resources: List[Type[DatabaseResource]],
+        session_factory: Union[scoped_session, sessionmaker] = None,
+        logger: Logger = None,
+        thread_limit: int = THREAD_LIMIT,
+        compression_min_size: int = COMPRESSION_MIN_SIZE,
+        read_your_writes: float = None,
+        admission_control: AdmissionControl = None,
+    ):
+        """
+        Implements an endpoint running an ordered list of create, update and delete operations across several models in
+        a single transaction. Each operation is an object of the form
+
+            {"op": "create", "model": "task", "data": [...], "batched": false}
+
+        where `model` is the table name of the model. Values of `data` may reference attributes of objects created or
+        updated by earlier operations in the batch via `{"$ref": [<operation>, <index of object>, <attribute>]}`, e.g.
+        to set foreign keys to generated primary keys.
+        :param resources: The endpoints, as returned by `DatabaseResource.make_endpoint`, of the models to expose. Their
+        schemas, logging and caches are used for the operations on their models.
+        :param session_factory: The sqlalchemy scoped_session object to use, defaults to that of the first resource
+        :param logger: The logger to use
+        :param thread_limit: The maximum number of worker threads concurrently running batches
+        :param compression_min_size: The minimum size in bytes of a response for it to be compressed
+        :param read_your_writes: The number of seconds after a batch during which the reads of the client run on the
+        primary, defaults to the longest window of `resources`
+        :param admission_control: Bounds the concurrent batches, rejecting those in excess with 429 or 503
+        """
+
+        by_name = dict()
+        for resource in resources:
+            name = resource.model.__tablename__
+
+            if name in by_name:
+                raise ValueError(f"Multiple resources are exposing the model '{name}'!")
+
+            by_name[name] = resource
+
+        windows = [r.read_your_writes for r in resources if r.read_your_writes is not None]
+        if read_your_writes is None and any(windows):
+            read_your_writes = max(windows)
+
+        state_dict = {
+            "resources": by_name,
+            "session_factory": session_factory or resources[0].session_factory,
+            "logger": logger or make_base_logger(cls.__name__),
+            "limiter": CapacityLimiter(thread_limit),
+            "compression_min_size": compression_min_size,
+            "read_your_writes": read_your_writes,
+            "admission": get_admission_controls(admission_control),
+        }
+
+        return type("BatchResource_", (BatchResource,), state_dict)
+
+    async def post(self, req: Request):
+        return self._mark_write(await self._run_in_thread(self._post, await req.json()))
+
+    def _get_resource(self, name: str) -> DatabaseResource:
+        if name not in self.resources:
+            raise KeyError(f"No resource is exposing the model '{name}'")
+
+        return self.resources[name](self.scope, self.receive, self.send)
+
+    @staticmethod
+    def _dereference(value, flushed: List[tuple]):
+        if not (isinstance(value, dict) and list(value.keys()) == [BATCH_REFERENCE]):
+            return value
+
+        operation, index, attribute = value[BATCH_REFERENCE]
+        if operation >= len(flushed) or not isinstance(flushed[operation][1], list):
+            raise ValueError(f"Operation {operation} is not a preceding create or update!")
+
+        resource, objs = flushed[operation]
+        field = get_schema_instance(resource.schema).fields[attribute]
+
+        return field.serialize(attribute, objs[index])
+
+    def _run_operation(self, session: Session, operation: Dict[str, Any], flushed: List[tuple]) -> tuple:
+        """
+        Runs `operation` in `session`, after resolving its references to the objects `flushed` by earlier operations.
+        Returns the resource of the model together with the flushed objects, or the number of deleted rows.
+        """
+
+        if operation.get("op") not in OPERATIONS:
+            raise ValueError(f"`op` must be one of: {', '.join(OPERATIONS)}")
+
+        resource = self._get_resource(operation.get("model"))
+        data = [{k: self._dereference(v, flushed) for k, v in r.items()} for r in operation.get("data", [])]
+
+        if operation["op"] == "create":
+            return resource, resource._create_objects(session, data)
+
+        if operation["op"] == "update":
+            return resource, resource._update_objects(session, data)
+
+        return resource, resource._delete_objects(session, data)
+
+    def _post(self, operations: List[Dict[str, Any]]):
+        self.logger.info(f"Now trying to run a batch of {len(operations):n} operations")
+        session = self.session_factory()
+
+        flushed = list()
+
+        try:
+            for operation in operations:
+                flushed.append(self._run_operation(session, operation, flushed))
+
+            # NB: Keys are read before committing, as that expires the objects
+            keys = [r._get_keys(res) if isinstance(res, list) else res for r, res in flushed]
+
+            session.commit()
+
+            for resource in {r.__class__: r for r, _ in flushed}.values():
+                resource._invalidate_cache()
+
+            self.logger.info(f"Successfully ran a batch of {len(operations):n} operations, now trying to serialize")
+
+            media = [
+                self._dump_result(session, resource, operation, res)
+                for operation, (resource, _), res in zip(operations, flushed, keys)
+            ]
+            status = HTTP_200_OK
+        except Exception as e:
+            self.logger.exception(e)
+            session.rollback()
+            failed = f" in operation {len(flushed):d}" if len(flushed) < len(operations) else ""
+            media = f"{e.__class__.__name__}{failed}: {e}"
+            status = HTTP_500_INTERNAL_SERVER_ERROR
+
+        self.session_factory.remove()
+
+        return self._respond(media, status)
+
+    @staticmethod
+    def _dump_result(
+        session: Session, resource: DatabaseResource, operation: Dict[str, Any], result: Union[List[tuple], int]
+    ):
+        if operation["op"] == "delete":
+            return {"deleted": result}
+
+        if not operation.get("batched", False):
+            return resource._dump_by_keys(session, result)
+
+        primary_keys = get_primary_keys(resource.model)
+        rows = [dict(zip(primary_keys, key)) for key in result]
+
+        return serialize(rows, resource.schema, many=True, only=primary_keys)
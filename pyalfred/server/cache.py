@@ -0,0 +1,149 @@
+import time
+from collections import OrderedDict
+from uuid import uuid4
+from threading import Lock
+from typing import Optional, Dict, Any
+from pyalfred.constants import CACHE_SIZE
+
+
+class CacheBackend(object):
+    def __init__(self):
+        """
+        Base class for caches of encoded responses. Entries are grouped by namespace, and each namespace carries a
+        version that is bumped on invalidation. As the version is part of the key of every entry, results computed
+        before an invalidation can never be served after it. As versions restart when the cache does, each namespace
+        also carries a random epoch, which distinguishes the versions of different caches and their restarts.
+        """
+
+        self.hits = 0
+        self.misses = 0
+
+    def version(self, namespace: str) -> int:
+        raise NotImplementedError()
+
+    def epoch(self, namespace: str) -> str:
+        raise NotImplementedError()
+
+    def get(self, namespace: str, version: int, key: str) -> Optional[bytes]:
+        raise NotImplementedError()
+
+    def set(self, namespace: str, version: int, key: str, value: bytes):
+        raise NotImplementedError()
+
+    def invalidate(self, namespace: str):
+        raise NotImplementedError()
+
+    def _record(self, value: Optional[bytes]) -> Optional[bytes]:
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+class MemoryCache(CacheBackend):
+    def __init__(self, max_size: int = CACHE_SIZE, ttl: float = None):
+        """
+        In-process LRU cache. Note that each worker process holds its own cache, and thus only sees the invalidations
+        of writes made through itself.
+        :param max_size: The maximum number of entries to keep
+        :param ttl: The number of seconds after which an entry expires, if any
+        """
+
+        super().__init__()
+        self._max_size = max_size
+        self._ttl = ttl
+
+        self._entries = OrderedDict()
+        self._versions = dict()
+        self._epoch = uuid4().hex
+        self._lock = Lock()
+
+    def version(self, namespace: str) -> int:
+        return self._versions.get(namespace, 0)
+
+    def epoch(self, namespace: str) -> str:
+        return self._epoch
+
+    def get(self, namespace: str, version: int, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get((namespace, version, key))
+
+            if entry is None:
+                return self._record(None)
+
+            expires, value = entry
+            if expires is not None and expires < time.monotonic():
+                del self._entries[(namespace, version, key)]
+                return self._record(None)
+
+            self._entries.move_to_end((namespace, version, key))
+
+            return self._record(value)
+
+    def set(self, namespace: str, version: int, key: str, value: bytes):
+        expires = time.monotonic() + self._ttl if self._ttl is not None else None
+
+        with self._lock:
+            if version != self.version(namespace):
+                return
+
+            self._entries[(namespace, version, key)] = (expires, value)
+            self._entries.move_to_end((namespace, version, key))
+
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, namespace: str):
+        with self._lock:
+            self._versions[namespace] = self.version(namespace) + 1
+
+            for k in [k for k in self._entries if k[0] == namespace]:
+                del self._entries[k]
+
+    def stats(self) -> Dict[str, Any]:
+        return {**super().stats(), "size": len(self._entries)}
+
+
+class RedisCache(CacheBackend):
+    def __init__(self, client, ttl: float = None, prefix: str = "pyalfred"):
+        """
+        Cache backed by Redis, shared between worker processes. Size is bounded by the eviction policy of the server.
+        :param client: A `redis.Redis` instance, or any object exposing `get`, `set` (including `nx`) and `incr` with
+        the same signatures
+        :param ttl: The number of seconds after which an entry expires, if any
+        :param prefix: The prefix of all keys
+        """
+
+        super().__init__()
+        self._client = client
+        self._ttl = ttl
+        self._prefix = prefix
+
+    def version(self, namespace: str) -> int:
+        return int(self._client.get(f"{self._prefix}:{namespace}:version") or 0)
+
+    def epoch(self, namespace: str) -> str:
+        # NB: Created by the first worker to need it, and again should the server lose it, e.g. on a restart
+        key = f"{self._prefix}:{namespace}:epoch"
+        epoch = self._client.get(key)
+
+        if epoch is None:
+            self._client.set(key, uuid4().hex, nx=True)
+            epoch = self._client.get(key)
+
+        return epoch.decode("utf-8") if isinstance(epoch, bytes) else epoch
+
+    def get(self, namespace: str, version: int, key: str) -> Optional[bytes]:
+        return self._record(self._client.get(f"{self._prefix}:{namespace}:{version:d}:{key}"))
+
+    def set(self, namespace: str, version: int, key: str, value: bytes):
+        ex = max(1, round(self._ttl)) if self._ttl is not None else None
+        self._client.set(f"{self._prefix}:{namespace}:{version:d}:{key}", value, ex=ex)
+
+    def invalidate(self, namespace: str):
+        self._client.incr(f"{self._prefix}:{namespace}:version")
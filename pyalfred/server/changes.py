@@ -0,0 +1,76 @@
+import json
+from typing import List, Dict, Any, Tuple
+from sqlalchemy import Column, Integer, String, Boolean, Index, insert, text
+from sqlalchemy.orm import Session, declarative_base
+from pyalfred.contract.utils import chunk
+from pyalfred.constants import CHUNK_SIZE
+
+
+Base = declarative_base()
+
+
+class Change(Base):
+    """
+    Log of the rows written through endpoints tracking changes, where `seq` is increasing in the order the changes
+    were made. Create the table via `Change.__table__.create(engine)`, or `Base.metadata.create_all(engine)` of this
+    module.
+
+    As the sequence is assigned when the change is made rather than when it is committed, the table is locked against
+    other writers until commit on Postgres, so that changes become visible in the order of their sequences. SQLite
+    serializes writers by itself, while on other databases allowing concurrent writers a change may still become
+    visible after changes with higher sequences.
+    """
+
+    __tablename__ = "pyalfred_change"
+    __table_args__ = (Index("ix_pyalfred_change_model_seq", "model", "seq"), {"sqlite_autoincrement": True})
+
+    seq = Column(Integer, primary_key=True, autoincrement=True)
+    model = Column(String, nullable=False)
+    key = Column(String, nullable=False)
+    deleted = Column(Boolean, nullable=False)
+
+
+def record_changes(session: Session, model: str, keys: List[Dict[str, Any]], deleted: bool = False):
+    """
+    Records that the rows of `model` with the serialized primary keys `keys` were upserted or deleted, in the
+    transaction of `session`.
+    """
+
+    records = [{"model": model, "key": json.dumps(k, sort_keys=True), "deleted": deleted} for k in keys]
+    if not records:
+        return
+
+    # NB: EXCLUSIVE conflicts with itself and the locks of writes, but not with reads. Record the changes after making
+    # them, such that writers lock the rows before the table
+    if session.get_bind(clause=Change.__table__).dialect.name == "postgresql":
+        session.execute(text(f"LOCK TABLE {Change.__tablename__} IN EXCLUSIVE MODE"))
+
+    for c in chunk(records, CHUNK_SIZE):
+        session.execute(insert(Change.__table__), c)
+
+
+def get_changes(session: Session, model: str, since: int, limit: int) -> Tuple[int, Dict[str, bool], bool]:
+    """
+    Returns the latest sequence among the at most `limit` changes of `model` made after `since`, together with the
+    serialized primary keys of the changed rows mapped to whether the row was deleted by its latest change, and
+    whether there are more changes.
+    """
+
+    query = (
+        session.query(Change.seq, Change.key, Change.deleted)
+        .filter(Change.model == model, Change.seq > since)
+        .order_by(Change.seq)
+        .limit(limit + 1)
+    )
+
+    rows = query.all()
+    more = len(rows) > limit
+
+    # NB: Only the latest change of each row matters, and dictionaries keep the order of their latest insertion
+    changes = dict()
+    for seq, key, deleted in rows[:limit]:
+        changes.pop(key, None)
+        changes[key] = deleted
+        since = seq
+
+    return since, changes, more
@@ -1,65 +1,176 @@
-from typing import Union, List, Type
-from sqlalchemy.orm import scoped_session, sessionmaker
+import json
+from decimal import Decimal
+from typing import Union, List, Type, Iterator, AsyncIterator, Dict, Any, Optional, Tuple, Callable
+from sqlalchemy import inspect, insert, update, and_, bindparam
+from sqlalchemy.orm import (
+    scoped_session,
+    sessionmaker,
+    Session,
+    Query,
+    load_only,
+    selectinload,
+    joinedload,
+    raiseload,
+)
 from logging import Logger
-from starlette.endpoints import HTTPEndpoint
+from functools import partial
+from anyio import CapacityLimiter, CancelScope, to_thread
 from starlette.requests import Request
-from starlette.responses import JSONResponse
-from starlette.status import HTTP_500_INTERNAL_SERVER_ERROR, HTTP_200_OK
+from starlette.datastructures import Headers
+from starlette.responses import Response, JSONResponse, StreamingResponse
+from starlette.status import HTTP_500_INTERNAL_SERVER_ERROR, HTTP_200_OK, HTTP_304_NOT_MODIFIED
 from pyalfred.contract.utils import chunk, serialize
+from pyalfred.contract.schemas import get_schema_instance, get_dumper, get_schema_name, is_schema, LazySchema
 from auto_schema import AutoMarshmallowSchema
-from query_serializer import QueryBuilder
-from pyalfred.contract.utils import get_columns_in_base_mixin
-from pyalfred.server.utils import make_base_logger, apply_filter_from_string
-from pyalfred.constants import CHUNK_SIZE
+from pyalfred.contract.utils import get_columns_in_base_mixin, get_primary_keys
+from pyalfred.contract.formats import Format, JSON
+from pyalfred.server.cache import CacheBackend
+from pyalfred.server.admission import SingleFlight, AdmissionControl, get_admission_controls
+from pyalfred.server.base import BaseResource
+from pyalfred.server.changes import record_changes, get_changes
+from pyalfred.server.replicas import ReplicaPolicy, POLICIES, get_pool_status
+from pyalfred.server.metrics import phase
+from pyalfred.server.utils import (
+    make_base_logger,
+    Operations,
+    compile_operations,
+    compile_filter,
+    normalize_operations,
+    apply_operations,
+    make_page_token,
+    get_column_keys,
+    load_records,
+    filter_by_primary_keys,
+    make_upsert_statement,
+    apply_aggregate_operations,
+    get_aggregate_label,
+    make_etag,
+    etag_matches,
+)
+from pyalfred.constants import (
+    CHUNK_SIZE,
+    THREAD_LIMIT,
+    STREAM_CHUNK_SIZE,
+    NEXT_PAGE_HEADER,
+    COMPRESSION_MIN_SIZE,
+    PAGE_SIZE,
+)
+
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+LOADERS = {"selectin": selectinload, "joined": joinedload, "lazy": None, "none": raiseload}
 
 
 def get_bool_from_string(x: str):
     return x.lower() == "true"
 
 
-class DatabaseResource(HTTPEndpoint):
+class DatabaseResource(BaseResource):
     schema = None
+    model = None
     session_factory = None
-    logger = None
+    cache = None
+    relationship_loading = None
+    track_changes = None
+    replicas = None
+    replica_policy = None
+    single_flight = None
 
     _create_ignore = None
 
     @classmethod
     def make_endpoint(
         cls,
-        schema: Type[AutoMarshmallowSchema],
+        schema: Union[Type[AutoMarshmallowSchema], Type[object]],
         session_factory: Union[scoped_session, sessionmaker],
         logger: Logger = None,
         mixin_ignore: Type[object] = None,
         create_ignore: List[str] = None,
+        thread_limit: int = THREAD_LIMIT,
+        cache: CacheBackend = None,
+        relationship_loading: str = "selectin",
+        compression_min_size: Optional[int] = COMPRESSION_MIN_SIZE,
+        track_changes: bool = False,
+        read_session_factory: Union[scoped_session, List[scoped_session]] = None,
+        replica_policy: Union[str, ReplicaPolicy] = "round_robin",
+        read_your_writes: float = None,
+        coalesce_reads: bool = False,
+        admission_control: Union[AdmissionControl, Dict[str, AdmissionControl]] = None,
     ):
         """
         Implements a base resources for exposing database models.
-        :param schema: The schema to use, must be marshmallow.Schema
+        :param schema: The schema to use, must be marshmallow.Schema. Alternatively the model to expose, whose schema is
+        then generated on the first request instead of on start up.
         :param session_factory: The sqlalchemy scoped_session object to use
         :param logger: The logger to use
         :param mixin_ignore: If all of your models inherit from a single mixin that defines server side generated
         columns, you may pass that here.
+        :param thread_limit: The maximum number of worker threads concurrently running database work for this endpoint.
+        Should not exceed the size of the connection pool backing `session_factory`.
+        :param cache: The cache in which to store encoded GET responses, invalidated on any write through this endpoint.
+        Endpoints exposing the same model should share the cache.
+        :param relationship_loading: The default strategy for loading the relationships dumped by the schema, one of
+        "selectin", "joined", "lazy" (i.e. as configured on the model) or "none" (i.e. not dumped, and raising rather
+        than loading if accessed). May be overridden per GET request via the `relations` parameter.
+        :param compression_min_size: The minimum size in bytes of a response for it to be compressed, if the client
+        accepts gzip or br (requires brotli). Pass `None` to never compress.
+        :param track_changes: Whether to record the rows written through this endpoint in the table of
+        `pyalfred.server.changes.Change`, which must exist, so that clients may fetch the changes since a sequence via
+        the `since` parameter of GET.
+        :param read_session_factory: The scoped_session object(s) of read replicas to run GET requests on, while writes
+        and locking reads run on `session_factory`
+        :param replica_policy: The policy selecting the replica of each read, one of "round_robin", "random" and
+        "least_used" (i.e. fewest checked out connections), or an instance of `ReplicaPolicy`
+        :param read_your_writes: If passed, the number of seconds after a write by a client during which its reads run
+        on `session_factory`, tracked via a cookie
+        :param coalesce_reads: Whether concurrent GET requests with equal parameters and format share a single query and
+        its encoded result. Note that a request may then see the result of a query that started before it arrived.
+        :param admission_control: Bounds the concurrent requests to this endpoint, rejecting those in excess with 429 or
+        503. Either shared by all methods, or a mapping of methods, e.g. "PUT", to their own limits.
         """
 
+        if relationship_loading not in LOADERS:
+            raise ValueError(f"`relationship_loading` must be one of: {', '.join(LOADERS)}")
+
+        if isinstance(replica_policy, str):
+            if replica_policy not in POLICIES:
+                raise ValueError(f"`replica_policy` must be one of: {', '.join(POLICIES)}")
+
+            replica_policy = POLICIES[replica_policy]()
+
+        replicas = read_session_factory or []
+        if not isinstance(replicas, (list, tuple)):
+            replicas = [replicas]
+
         _create_ignore = []
         if mixin_ignore is not None:
             _create_ignore += get_columns_in_base_mixin(mixin_ignore)
         elif create_ignore is not None:
             _create_ignore += create_ignore
 
+        name = get_schema_name(schema)
+
         state_dict = {
-            "schema": schema,
+            "schema": schema if is_schema(schema) else LazySchema(schema),
+            "model": schema.Meta.model if is_schema(schema) else schema,
             "session_factory": session_factory,
-            "logger": logger or make_base_logger(schema.__name__),
+            "logger": logger or make_base_logger(name),
+            "limiter": CapacityLimiter(thread_limit),
+            "cache": cache,
+            "relationship_loading": relationship_loading,
+            "compression_min_size": compression_min_size,
+            "track_changes": track_changes,
+            "replicas": list(replicas),
+            "replica_policy": replica_policy,
+            "read_your_writes": read_your_writes,
+            "single_flight": SingleFlight() if coalesce_reads else None,
+            "admission": get_admission_controls(admission_control),
             "_create_ignore": _create_ignore,
         }
 
-        return type(f"DatabaseResource_{schema.__name__}", (DatabaseResource,), state_dict)
-
-    @property
-    def model(self):
-        return self.schema.Meta.model
+        return type(f"DatabaseResource_{name}", (DatabaseResource,), state_dict)
 
     @property
     def fields_to_skip_on_create(self):
@@ -67,53 +178,611 @@ class DatabaseResource(HTTPEndpoint):
 
         return self._create_ignore + schema_fields_to_load
 
+    @classmethod
+    def pool_status(cls) -> Dict[str, Dict[str, Any]]:
+        """
+        Returns the status of the connection pools of the primary and the replicas.
+        """
+
+        status = {"primary": get_pool_status(cls.session_factory)}
+        status.update((f"replica_{i:d}", get_pool_status(r)) for i, r in enumerate(cls.replicas))
+
+        return status
+
+    def _get_read_factory(self, ops: str = "") -> scoped_session:
+        """
+        Returns the session factory to read with, i.e. a replica selected by the policy unless there are none, the
+        client wrote within the read-your-writes window, or the read locks rows.
+        """
+
+        if not self.replicas or self._wrote_recently():
+            return self.session_factory
+
+        try:
+            locking = compile_operations(ops).for_update
+        except Exception:
+            # NB: Invalid operations are reported when running the read
+            locking = False
+
+        return self.session_factory if locking else self.replica_policy.choose(self.replicas)
+
+    @staticmethod
+    def _make_unscoped_session(session_factory: Union[scoped_session, sessionmaker]) -> Session:
+        """
+        Creates a session that is not registered in the `scoped_session` registry, for use when the session outlives
+        the worker thread that created it.
+        """
+
+        if isinstance(session_factory, scoped_session):
+            return session_factory.session_factory()
+
+        return session_factory()
+
+    def _get_loading(self, strategy: str = None, fields: List[str] = None) -> Tuple[list, List[str]]:
+        """
+        Returns the loader options for the relationships that are dumped by the schema, together with the
+        relationships to exclude from the dump.
+        """
+
+        strategy = strategy or self.relationship_loading
+        if strategy not in LOADERS:
+            raise ValueError(f"`relations` must be one of: {', '.join(LOADERS)}")
+
+        dumped = fields or [k for k, f in get_schema_instance(self.schema).fields.items() if not f.load_only]
+        relationships = [r.key for r in inspect(self.model).relationships if r.key in dumped]
+
+        loader = LOADERS[strategy]
+        options = [loader(getattr(self.model, r)) for r in relationships] if loader is not None else []
+
+        return options, (relationships if strategy == "none" else [])
+
+    def _load_by_keys(self, session: Session, keys: List[tuple], options: list) -> list:
+        """
+        Selects the objects with primary keys `keys` in chunks, applying the loader `options`, in the order of `keys`.
+        """
+
+        mapper = inspect(self.model)
+        loaded = dict()
+
+        for c in chunk(keys, CHUNK_SIZE):
+            query = filter_by_primary_keys(self.model, session.query(self.model), c).options(*options)
+            loaded.update((tuple(mapper.primary_key_from_instance(o)), o) for o in query)
+
+        return [loaded[k] for k in keys if k in loaded]
+
+    def _build_query(self, session: Session, filter_: str, fields: List[str] = None) -> Query:
+        query = session.query(self.model)
+        if filter_:
+            with phase("parse"):
+                query = query.filter(compile_filter(self.model, filter_))
+
+        if fields is not None:
+            columns = get_column_keys(self.model)
+            query = query.options(load_only(*(getattr(self.model, f) for f in fields if f in columns)))
+
+        return query
+
+    def _parse_fields(self, fields: str) -> Optional[List[str]]:
+        """
+        Parses the comma separated fields to project, always including the primary key(s).
+        """
+
+        if not fields:
+            return None
+
+        requested = [f.strip() for f in fields.split(",") if f.strip()]
+
+        return list(dict.fromkeys(get_primary_keys(self.model) + requested))
+
     async def get(self, req: Request):
-        session = self.session_factory()
+        filter_ = req.query_params.get("filter", None)
+        ops = req.query_params.get("ops", "")
+        fields = self._parse_fields(req.query_params.get("fields", None))
+        relations = req.query_params.get("relations", None)
+
+        since = req.query_params.get("since", None)
+        if since is not None:
+            page_size = req.query_params.get("page_size", PAGE_SIZE)
+            return await self._run_in_thread(self._get_changes, since, page_size, fields)
+
+        if get_bool_from_string(req.query_params.get("stream", "false")):
+            ndjson = NDJSON_MEDIA_TYPE in req.headers.get("accept", "")
+            return await self._get_stream(filter_, ops, fields, relations, ndjson)
+
+        if self.single_flight is not None and self._can_coalesce(ops):
+            return await self._get_coalesced(filter_, ops, fields, relations)
+
+        return await self._run_in_thread(self._get, filter_, ops, fields, relations)
+
+    def _get_changes(self, since: Union[int, str], page_size: Union[int, str], fields: List[str] = None):
+        """
+        Returns the rows upserted and the primary keys of the rows deleted after the sequence `since`, considering at
+        most `page_size` changes, together with the sequence to continue from and whether there are more changes.
+        """
+
+        session_factory = self._get_read_factory()
+        session = session_factory()
 
         try:
-            query = session.query(self.model).with_for_update()
-            filter_ = req.query_params.get("filter", None)
-            if filter_:
-                query_builder = QueryBuilder(self.model)
-                query = query_builder.from_string(query, filter_)
+            if not self.track_changes:
+                raise NotImplementedError("Changes are not tracked for this endpoint!")
+
+            since, page_size = int(since), int(page_size)
+            if since < 0 or page_size < 1:
+                raise ValueError("`since` must be non-negative and `page_size` positive!")
+
+            since, changes, more = get_changes(session, self.model.__tablename__, since, page_size)
 
-            ops = req.query_params.get("ops", "")
-            result = apply_filter_from_string(self.model, query, ops.split(","))
+            primary_keys = get_primary_keys(self.model)
+            deleted = [json.loads(k) for k, d in changes.items() if d]
+            upserted = [json.loads(k) for k, d in changes.items() if not d]
 
-            if result is None:
-                result = list()
-            elif not isinstance(result, list):
-                result = [result]
+            columns = get_column_keys(self.model)
+            records = load_records(get_schema_instance(self.schema, many=True, only=primary_keys), upserted, self.model)
+            keys = [tuple(r[columns[k]] for k in primary_keys) for r in records]
 
-            media = serialize(result, self.schema, many=True)
+            options, exclude = self._get_loading(fields=fields)
+            objs = self._load_by_keys(session, keys, options)
+
+            media = {
+                "seq": since,
+                "upserted": serialize(objs, self.schema, many=True, only=fields, exclude=exclude),
+                "deleted": deleted,
+                "more": more,
+            }
             status = HTTP_200_OK
         except Exception as e:
             self.logger.exception(e)
             status = HTTP_500_INTERNAL_SERVER_ERROR
             media = f"{e.__class__.__name__}: {e}"
 
-        self.session_factory.remove()
+        session_factory.remove()
+
+        return self._respond(media, status)
+
+    def _record_changes(self, session: Session, keys: List[tuple], deleted: bool = False):
+        if not self.track_changes:
+            return
+
+        primary_keys = get_primary_keys(self.model)
+        rows = [dict(zip(primary_keys, key)) for key in keys]
+
+        record_changes(session, self.model.__tablename__, serialize(rows, self.schema, only=primary_keys), deleted)
+
+    @property
+    def _cache_namespace(self) -> str:
+        return self.model.__tablename__
 
-        return JSONResponse(media, status)
+    def _make_cache_key(self, filter_: str, ops: str, fields: List[str] = None, relations: str = None) -> str:
+        fields = ",".join(fields or [])
+        key = f"{(filter_ or '').strip()}:{normalize_operations(ops)}:{fields}:{relations}"
+
+        return f"{self.schema.__name__}:{self.format.media_type}:{key}"
+
+    def _invalidate_cache(self):
+        if self.cache is not None:
+            self.cache.invalidate(self._cache_namespace)
+
+    def _can_coalesce(self, ops: str) -> bool:
+        # NB: Locking reads must lock for each request, and invalid operations are left to fail in `_get`
+        try:
+            return not compile_operations(ops).for_update
+        except Exception:
+            return False
+
+    async def _get_coalesced(self, filter_: str, ops: str, fields: List[str] = None, relations: str = None):
+        """
+        Runs the query of a GET once for all concurrent requests with equal parameters and format, sharing the encoded
+        result. Each request then checks its ETag and compresses the result according to its own headers.
+        """
+
+        format_ = self.format
+        key = (filter_, ops, tuple(fields or []), relations, format_.media_type, self._wrote_recently())
+
+        load = partial(self._run_in_thread, self._load, filter_, ops, fields, relations, format_)
+        status, content, headers = await self.single_flight.run(key, load)
+
+        # NB: Compressing is left out of the limiter, as it does not hold a connection
+        if_none_match = Headers(scope=self.scope).get("if-none-match")
+        return await to_thread.run_sync(
+            partial(self._make_get_response, status, content, headers, format_, if_none_match)
+        )
+
+    def _get(self, filter_: str, ops: str, fields: List[str] = None, relations: str = None):
+        format_ = self.format
+        if_none_match = Headers(scope=self.scope).get("if-none-match")
+        status, content, headers = self._load(filter_, ops, fields, relations, format_, if_none_match)
+
+        return self._make_get_response(status, content, headers, format_, if_none_match)
+
+    def _make_get_response(
+        self, status: int, content, headers: Dict[str, str], format_: Format, if_none_match: str = None
+    ) -> Response:
+        if status == HTTP_304_NOT_MODIFIED:
+            return self._not_modified(headers["ETag"])
+
+        if status != HTTP_200_OK:
+            return self._respond(content, status)
+
+        if "ETag" in headers and etag_matches(headers["ETag"], if_none_match):
+            return self._not_modified(headers["ETag"])
+
+        return self._make_response(content, format_.media_type, headers)
+
+    def _load(
+        self,
+        filter_: str,
+        ops: str,
+        fields: List[str] = None,
+        relations: str = None,
+        format_: Format = JSON,
+        if_none_match: str = None,
+    ) -> Tuple[int, Any, Dict[str, str]]:
+        """
+        Runs the query of a GET, returning the status, the encoded result (or error message) and the headers of the
+        response.
+        """
+
+        etag = None
+        session_factory = self._get_read_factory(ops)
+        from_primary = session_factory is self.session_factory
+
+        # NB: With a cache the ETag derives from the version of the model, so unchanged results are confirmed without
+        # querying. Otherwise it is the hash of the encoded result, which only saves the transfer. Results read from a
+        # replica may lag the version, and are thus neither cached nor tagged by it. Clients within their
+        # read-your-writes window skip the cache, such that they always see their own writes
+        if self.cache is not None:
+            key = self._make_cache_key(filter_, ops, fields, relations)
+            version = self.cache.version(self._cache_namespace)
+            epoch = self.cache.epoch(self._cache_namespace)
+            versioned_etag = make_etag(f"{self._cache_namespace}:{epoch}:{version:d}:{key}".encode("utf-8"))
+
+            if not self._wrote_recently():
+                if etag_matches(versioned_etag, if_none_match):
+                    return HTTP_304_NOT_MODIFIED, None, {"ETag": versioned_etag}
+
+                content = self.cache.get(self._cache_namespace, version, key)
+                if content is not None:
+                    return HTTP_200_OK, content, {"ETag": versioned_etag}
+
+            if from_primary:
+                etag = versioned_etag
+
+        session = session_factory()
+
+        headers = dict()
+
+        try:
+            with phase("parse"):
+                operations = compile_operations(ops)
+
+            if operations.is_aggregate:
+                query = self._build_query(session, filter_)
+
+                with phase("query"):
+                    media = self._aggregate(query, operations)
+            else:
+                options, exclude = self._get_loading(relations, fields)
+                query = self._build_query(session, filter_, fields).options(*options)
+
+                with phase("query"):
+                    result = apply_operations(self.model, query, operations).all()
+
+                if operations.page_size is not None and len(result) > operations.page_size:
+                    result = result[: operations.page_size]
+                    headers[NEXT_PAGE_HEADER] = make_page_token(self.model, operations, result[-1])
+
+                with phase("serialize"):
+                    media = serialize(result, self.schema, many=True, only=fields, exclude=exclude)
+
+            status = HTTP_200_OK
+        except Exception as e:
+            self.logger.exception(e)
+            status = HTTP_500_INTERNAL_SERVER_ERROR
+            media = f"{e.__class__.__name__}: {e}"
+
+        session_factory.remove()
+
+        if status != HTTP_200_OK:
+            return status, media, dict()
+
+        with phase("encode"):
+            content = format_.encode(media)
+
+        # NB: Locking reads are never cached nor tagged, and pages with continuations are not cached as the token is
+        # in the headers
+        if operations.for_update:
+            return HTTP_200_OK, content, headers
+
+        if self.cache is not None and from_primary and not headers:
+            self.cache.set(self._cache_namespace, version, key, content)
+
+        return HTTP_200_OK, content, {**headers, "ETag": etag or make_etag(content)}
+
+    def _aggregate(self, query: Query, operations: Operations) -> List[Dict[str, Any]]:
+        """
+        Runs the aggregation of `operations` in the database, serializing grouping attributes and minima/maxima via
+        the fields of the schema.
+        """
+
+        fields = get_schema_instance(self.schema).fields
+        result = list()
+
+        def dump(attribute_name, value):
+            field = fields.get(attribute_name)
+            return field.serialize(attribute_name, {attribute_name: value}) if field is not None else value
+
+        for row in apply_aggregate_operations(self.model, query, operations):
+            values = iter(row)
+            media = {c: dump(c, next(values)) for c in operations.group_by}
+
+            for function, attribute_name in operations.aggregates:
+                value = next(values)
+
+                if function in ("min", "max"):
+                    value = dump(attribute_name, value)
+                elif isinstance(value, Decimal):
+                    value = float(value)
+
+                media[get_aggregate_label(function, attribute_name)] = value
+
+            result.append(media)
+
+        return result
+
+    async def _get_stream(
+        self, filter_: str, ops: str, fields: Optional[List[str]], relations: Optional[str], ndjson: bool
+    ) -> Response:
+        """
+        Streams the result of a GET. As its session holds a connection until the stream ends, the stream holds a token
+        of the limiter throughout rather than per chunk.
+        """
+
+        token = object()
+        await self.limiter.acquire_on_behalf_of(token)
+
+        try:
+            result = await to_thread.run_sync(partial(self._get_streaming, filter_, ops, fields, relations, ndjson))
+        except BaseException:
+            self.limiter.release_on_behalf_of(token)
+            raise
+
+        if isinstance(result, Response):
+            self.limiter.release_on_behalf_of(token)
+            return result
+
+        media_type = NDJSON_MEDIA_TYPE if ndjson else JSON.media_type
+
+        return StreamingResponse(self._iterate(result, token), media_type=media_type)
+
+    async def _iterate(self, chunks: Iterator[bytes], token: object) -> AsyncIterator[bytes]:
+        try:
+            while True:
+                chunk = await to_thread.run_sync(next, chunks, None)
+
+                if chunk is None:
+                    break
+
+                yield chunk
+        finally:
+            # NB: Closing the generator closes its session, which must happen even if the client disconnected
+            try:
+                with CancelScope(shield=True):
+                    await to_thread.run_sync(chunks.close)
+            finally:
+                self.limiter.release_on_behalf_of(token)
+
+    def _get_streaming(
+        self, filter_: str, ops: str, fields: Optional[List[str]], relations: Optional[str], ndjson: bool
+    ) -> Union[Response, Iterator[bytes]]:
+        session = self._make_unscoped_session(self._get_read_factory(ops))
+
+        try:
+            operations = compile_operations(ops)
+            if operations.page_size is not None or operations.is_aggregate:
+                raise NotImplementedError("Pagination and aggregation are not supported when streaming!")
+
+            # NB: Joined eager loading of collections cannot be combined with `yield_per`
+            relations = "selectin" if (relations or self.relationship_loading) == "joined" else relations
+            options, exclude = self._get_loading(relations, fields)
+
+            query = self._build_query(session, filter_, fields).options(*options)
+            query = apply_operations(self.model, query, operations)
+            dump = get_dumper(self.schema, many=True, only=fields, exclude=exclude)
+        except Exception as e:
+            self.logger.exception(e)
+            session.close()
+
+            return JSONResponse(f"{e.__class__.__name__}: {e}", HTTP_500_INTERNAL_SERVER_ERROR)
+
+        return self._stream(session, query, dump, ndjson)
+
+    def _stream(self, session: Session, query: Query, dump: Callable, ndjson: bool) -> Iterator[bytes]:
+        """
+        Serializes the result of `query` in batches of `STREAM_CHUNK_SIZE`, so that at most one batch of ORM objects
+        is held in memory at any time. Emits either a JSON array or newline delimited JSON. Errors are raised after
+        logging, such that the connection is aborted rather than the output silently truncated.
+        """
+
+        def encode(batch) -> bytes:
+            dumped = dump(batch)
+
+            if ndjson:
+                return b"".join(JSON.encode(d) + b"\n" for d in dumped)
+
+            return JSON.encode(dumped)[1:-1]
+
+        try:
+            if not ndjson:
+                yield b"["
+
+            prefix = b""
+            batch = list()
+            for obj in query.yield_per(STREAM_CHUNK_SIZE):
+                batch.append(obj)
+
+                if len(batch) < STREAM_CHUNK_SIZE:
+                    continue
+
+                yield prefix + encode(batch)
+                prefix = b"" if ndjson else b","
+                batch.clear()
+
+            if batch:
+                yield prefix + encode(batch)
+
+            if not ndjson:
+                yield b"]"
+        except Exception as e:
+            self.logger.exception(e)
+            raise
+        finally:
+            session.close()
 
     async def put(self, req: Request):
         batched = get_bool_from_string(req.query_params.get("batched", "false"))
+        bulk = get_bool_from_string(req.query_params.get("bulk", "false"))
+        upsert = get_bool_from_string(req.query_params.get("upsert", "false"))
+
+        data = await req.json()
+
+        if upsert:
+            conflict = [c for c in req.query_params.get("conflict", "").split(",") if c]
+            conflict = conflict or get_primary_keys(self.model)
+            return self._mark_write(await self._run_in_thread(self._put_bulk, data, batched, conflict))
+
+        return self._mark_write(await self._run_in_thread(self._put_bulk if bulk else self._put, data, batched))
+
+    def _bulk_insert(
+        self, session: Session, records: List[Dict[str, Any]], keys_only: bool, conflict: List[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Inserts `records` via chunked executemany statements, bypassing the unit of work, and returns the inserted rows
+        keyed on the attributes of the model, in the same order as `records`. If `conflict` is passed, rows conflicting
+        on those attributes are instead updated with the values of the record.
+        """
+
+        table = self.model.__table__
+        dialect = session.get_bind(inspect(self.model)).dialect
+
+        if not getattr(dialect, "insert_executemany_returning", False):
+            raise NotImplementedError("Bulk inserts require a dialect supporting executemany with RETURNING!")
+
+        columns = get_column_keys(self.model)
+        attributes = {v: k for k, v in columns.items()}
+        returning = table.primary_key.columns if keys_only else table.columns
 
-        schema = self.schema(dump_only=self.fields_to_skip_on_create, many=True)
-        objs = schema.load_instance(await req.json())
+        # NB: executemany requires all parameter sets of a statement to share keys
+        groups = dict()
+        for i, record in enumerate(records):
+            groups.setdefault(frozenset(record.keys()), list()).append((i, record))
 
-        self.logger.info(f"Now trying to create {len(objs):n} objects")
+        rows = [None] * len(records)
+        for keys, group in groups.items():
+            if conflict is None:
+                statement = insert(table)
+            else:
+                conflict_columns = [columns[c] for c in conflict]
+                to_update = [k for k in keys if k not in conflict_columns and k not in table.primary_key.columns]
+                statement = make_upsert_statement(table, dialect, conflict_columns, to_update)
+
+            statement = statement.returning(*returning, sort_by_parameter_order=True)
+
+            for c in chunk(group, CHUNK_SIZE):
+                result = session.execute(statement, [r for _, r in c])
+
+                for (i, _), row in zip(c, result.mappings()):
+                    rows[i] = {attributes[k]: v for k, v in row.items()}
+
+        return rows
+
+    def _put_bulk(self, data, batched: bool, conflict: List[str] = None):
+        verb = "create" if conflict is None else "upsert"
+        self.logger.info(f"Now trying to bulk {verb} {len(data):n} objects")
         session = self.session_factory()
 
         try:
+            # NB: Conflicts are detected on the conflict columns, so these are loaded even if ignored on create. New
+            # objects typically lack the values of those, e.g. generated keys, which are then left to the database
+            skipped = [f for f in self.fields_to_skip_on_create if conflict is None or f not in conflict]
+            generated = [f for f in self.fields_to_skip_on_create if f not in skipped]
+            data = [{k: v for k, v in d.items() if not (k in generated and v is None)} for d in data]
+
+            schema = get_schema_instance(self.schema, dump_only=skipped, many=True)
+            records = load_records(schema, data, self.model)
+
+            rows = self._bulk_insert(session, records, keys_only=batched, conflict=conflict)
+
+            primary_keys = get_primary_keys(self.model)
+            self._record_changes(session, [tuple(r[k] for k in primary_keys) for r in rows])
+
+            session.commit()
+            self._invalidate_cache()
+            self.logger.info(f"Successfully {verb}d {len(rows):n} objects, now trying to serialize")
+
+            only = get_primary_keys(self.model) if batched else None
+            media = serialize(rows, self.schema, many=True, only=only)
+            status = HTTP_200_OK
+        except Exception as e:
+            self.logger.exception(e)
+            status = HTTP_500_INTERNAL_SERVER_ERROR
+            media = f"{e.__class__.__name__}: {e}"
+            session.rollback()
+
+        self.session_factory.remove()
+
+        return self._respond(media, status)
+
+    def _get_keys(self, objs: list) -> List[tuple]:
+        mapper = inspect(self.model)
+        return [tuple(mapper.primary_key_from_instance(obj)) for obj in objs]
+
+    def _dump_by_keys(self, session: Session, keys: List[tuple]) -> List[Dict[str, Any]]:
+        """
+        Reloads and dumps the objects with primary keys `keys`. Used after commits, as reloading the expired objects in
+        chunks avoids having each one refresh itself when dumped.
+        """
+
+        options, exclude = self._get_loading()
+
+        with phase("query"):
+            objs = self._load_by_keys(session, keys, options)
+
+        with phase("serialize"):
+            return serialize(objs, self.schema, many=True, exclude=exclude)
+
+    def _create_objects(self, session: Session, data: List[Dict[str, Any]]) -> list:
+        """
+        Loads the objects of `data` and adds them to `session`, flushing in chunks so that server generated values are
+        populated. Returns the flushed objects.
+        """
+
+        with phase("deserialize"):
+            schema = self.schema(dump_only=self.fields_to_skip_on_create, many=True)
+            objs = schema.load_instance(data)
+
+        with phase("query"):
             for c in chunk(objs, CHUNK_SIZE):
                 session.add_all(c)
                 session.flush()
 
+        self._record_changes(session, self._get_keys(objs))
+
+        return objs
+
+    def _put(self, data, batched: bool):
+        self.logger.info(f"Now trying to create {len(data):n} objects")
+        session = self.session_factory()
+
+        try:
+            keys = self._get_keys(self._create_objects(session, data))
+
             session.commit()
-            self.logger.info(f"Successfully created {len(objs):n} objects, now trying to serialize")
+            self._invalidate_cache()
+            self.logger.info(f"Successfully created {len(keys):n} objects, now trying to serialize")
+
+            media = self._dump_by_keys(session, keys) if not batched else list()
 
-            media = serialize(objs, self.schema, many=True) if not batched else []
             status = HTTP_200_OK
         except Exception as e:
             self.logger.exception(e)
@@ -123,15 +792,67 @@ class DatabaseResource(HTTPEndpoint):
 
         self.session_factory.remove()
 
-        return JSONResponse(media, status)
+        return self._respond(media, status)
 
     async def delete(self, req: Request):
+        data = [{"id": id_} for id_ in req.query_params.getlist("id")]
+
+        body = await req.body()
+        if body:
+            data.extend(json.loads(body))
+
+        return self._mark_write(await self._run_in_thread(self._delete, data, req.query_params.get("filter", None)))
+
+    def _delete_objects(self, session: Session, data: List[Dict[str, Any]]) -> int:
+        """
+        Deletes the objects whose primary keys are given in `data`, in chunks of `IN` statements. Returns the number of
+        deleted rows.
+        """
+
+        primary_keys = get_primary_keys(self.model)
+        columns = get_column_keys(self.model)
+
+        schema = get_schema_instance(self.schema, many=True, only=primary_keys)
+        keys = [tuple(r[columns[k]] for k in primary_keys) for r in load_records(schema, data, self.model)]
+
+        nums = 0
+        for c in chunk(keys, CHUNK_SIZE):
+            query = filter_by_primary_keys(self.model, session.query(self.model), c)
+            nums += query.delete(synchronize_session=False)
+
+        self._record_changes(session, keys, deleted=True)
+
+        return nums
+
+    def _delete(self, data: List[Dict[str, Any]], filter_: str):
+        """
+        Deletes either the objects whose primary keys are given in `data`, in chunks of `IN` statements, or the objects
+        matching `filter_`, all within a single transaction.
+        """
+
         session = self.session_factory()
 
         try:
-            nums = session.query(self.model).filter(self.model.id == req.query_params["id"]).delete("fetch")
-            self.logger.info(f"Now trying to delete {nums:n} objects")
+            if bool(data) == bool(filter_):
+                raise ValueError("Must specify exactly one of primary keys or a filter!")
+
+            if filter_:
+                self.logger.info(f"Now trying to delete objects matching '{filter_}'")
+                query = self._build_query(session, filter_)
+
+                keys = list()
+                if self.track_changes:
+                    primary_keys = [getattr(self.model, k) for k in get_primary_keys(self.model)]
+                    keys = [tuple(r) for r in query.with_entities(*primary_keys)]
+
+                nums = query.delete(synchronize_session=False)
+                self._record_changes(session, keys, deleted=True)
+            else:
+                self.logger.info(f"Now trying to delete {len(data):n} objects")
+                nums = self._delete_objects(session, data)
+
             session.commit()
+            self._invalidate_cache()
 
             self.logger.info(f"Successfully deleted {nums:n} objects")
 
@@ -145,28 +866,126 @@ class DatabaseResource(HTTPEndpoint):
 
         self.session_factory.remove()
 
-        return JSONResponse(media, status)
+        return self._respond(media, status)
 
     async def patch(self, req: Request):
         batched = get_bool_from_string(req.query_params.get("batched", "false"))
+        bulk = get_bool_from_string(req.query_params.get("bulk", "false"))
+
+        data = await req.json()
+
+        return self._mark_write(await self._run_in_thread(self._patch_bulk if bulk else self._patch, data, batched))
+
+    def _bulk_update(self, session: Session, records: List[Dict[str, Any]]) -> List[tuple]:
+        """
+        Updates `records` via executemany `UPDATE ... WHERE <primary key> = ...` statements, grouping the records on
+        the columns they contain so that only the changed columns are sent. Returns the primary keys of the records,
+        raising if any of them matches no row.
+        """
+
+        table = self.model.__table__
+        primary_keys = [c.key for c in table.primary_key.columns]
+
+        groups = dict()
+        keys = list()
+
+        for record in records:
+            if any(k not in record for k in primary_keys):
+                raise ValueError(f"All objects must specify the primary key(s): {', '.join(primary_keys)}")
 
-        schema = self.schema(many=True)
-        objs = schema.load_instance(await req.json())
+            key = tuple(record.pop(k) for k in primary_keys)
+            keys.append(key)
 
+            if not record:
+                continue
+
+            record.update({f"_pk_{k}": v for k, v in zip(primary_keys, key)})
+            groups.setdefault(frozenset(record.keys()), list()).append(record)
+
+        where = and_(*(table.c[k] == bindparam(f"_pk_{k}") for k in primary_keys))
+        statement = update(table).where(where)
+
+        for group in groups.values():
+            for c in chunk(group, CHUNK_SIZE):
+                session.execute(statement, c)
+
+        # NB: Checked via the keys rather than the row counts, which not all drivers report for executemany
+        found = set()
+        for c in chunk(list(dict.fromkeys(keys)), CHUNK_SIZE):
+            query = filter_by_primary_keys(self.model, session.query(self.model), c)
+            found.update(tuple(r) for r in query.with_entities(*table.primary_key.columns))
+
+        missing = [k for k in keys if k not in found]
+        if missing:
+            raise ValueError(f"No rows exist with the primary key(s): {', '.join(map(str, missing[:10]))}")
+
+        return keys
+
+    def _patch_bulk(self, data, batched: bool):
         session = self.session_factory()
-        self.logger.info(f"Now trying to update {len(objs):n} objects")
+        self.logger.info(f"Now trying to bulk update {len(data):n} objects")
 
         try:
+            records = load_records(get_schema_instance(self.schema, many=True, partial=True), data, self.model)
+            keys = self._bulk_update(session, records)
+            self._record_changes(session, keys)
+
+            session.commit()
+            self._invalidate_cache()
+            self.logger.info(f"Successfully updated {len(keys):n} objects, now trying to serialize")
+
+            media = self._dump_by_keys(session, keys) if not batched else list()
+
+            status = HTTP_200_OK
+        except Exception as e:
+            self.logger.exception(e)
+            session.rollback()
+            media = f"{e.__class__.__name__}: {e}"
+            status = HTTP_500_INTERNAL_SERVER_ERROR
+
+        self.session_factory.remove()
+
+        return self._respond(media, status)
+
+    def _update_objects(self, session: Session, data: List[Dict[str, Any]]) -> list:
+        """
+        Loads the objects of `data` and merges them into `session`, flushing in chunks. Returns the merged objects.
+        Objects may be sparse, i.e. only specify the primary key(s) and the attributes to update.
+        """
+
+        # NB: As `merge` only copies the attributes set on the loaded objects, omitted attributes are left as they are
+        with phase("deserialize"):
+            objs = self.schema(many=True, partial=True).load_instance(data)
+
+        merged = list()
+        existing = list()
+
+        with phase("query"):
             for c in chunk(objs, CHUNK_SIZE):
-                for obj in c:
-                    session.merge(obj)
+                # NB: Loads, and holds on to, the existing rows up front so that `merge` finds them in the identity
+                # map instead of issuing one SELECT per object
+                existing.extend(filter_by_primary_keys(self.model, session.query(self.model), self._get_keys(c)))
 
+                merged.extend(session.merge(obj) for obj in c)
                 session.flush()
 
+        self._record_changes(session, self._get_keys(merged))
+
+        return merged
+
+    def _patch(self, data, batched: bool):
+        session = self.session_factory()
+        self.logger.info(f"Now trying to update {len(data):n} objects")
+
+        try:
+            keys = self._get_keys(self._update_objects(session, data))
+
             session.commit()
-            self.logger.info(f"Successfully updated {len(objs):n} objects, now trying to serialize")
+            self._invalidate_cache()
+            self.logger.info(f"Successfully updated {len(keys):n} objects, now trying to serialize")
+
+            media = self._dump_by_keys(session, keys) if not batched else list()
 
-            media = serialize(objs, self.schema, many=True) if not batched else []
             status = HTTP_200_OK
         except Exception as e:
             self.logger.exception(e)
@@ -176,4 +995,4 @@ class DatabaseResource(HTTPEndpoint):
 
         self.session_factory.remove()
 
-        return JSONResponse(media, status)
+        return self._respond(media, status)
@@ -0,0 +1,272 @@
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+from contextvars import ContextVar
+from threading import Lock
+from typing import Dict, Tuple, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Mapper
+from starlette.endpoints import HTTPEndpoint
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+from starlette.routing import Match
+from pyalfred.constants import LATENCY_BUCKETS, UNMATCHED_ROUTE
+
+
+class RequestMetrics(object):
+    __slots__ = ("phases", "statements", "rows", "db")
+
+    def __init__(self):
+        """
+        The time spent in each phase of a request, together with the number of SQL statements and rows, and the time
+        spent executing the statements.
+        """
+
+        self.phases = dict()
+        self.statements = 0
+        self.rows = 0
+        self.db = 0.0
+
+    def add(self, name: str, elapsed: float):
+        self.phases[name] = self.phases.get(name, 0.0) + elapsed
+
+    def server_timing(self, total: float) -> str:
+        timings = [f"{k};dur={1e3 * v:.2f}" for k, v in self.phases.items()]
+        timings.append(f'db;dur={1e3 * self.db:.2f};desc="{self.statements:d} statements, {self.rows:d} rows"')
+        timings.append(f"total;dur={1e3 * total:.2f}")
+
+        return ", ".join(timings)
+
+
+_current: ContextVar[Optional[RequestMetrics]] = ContextVar("pyalfred_request_metrics", default=None)
+
+
+class _Phase(object):
+    __slots__ = ("metrics", "name", "start")
+
+    def __init__(self, metrics: RequestMetrics, name: str):
+        self.metrics = metrics
+        self.name = name
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.metrics.add(self.name, time.perf_counter() - self.start)
+
+
+_UNMEASURED = nullcontext()
+
+
+def phase(name: str):
+    """
+    Times the enclosed block as the phase `name` of the current request. A no-op unless the request is measured.
+    """
+
+    metrics = _current.get()
+    if metrics is None:
+        return _UNMEASURED
+
+    return _Phase(metrics, name)
+
+
+class _Histogram(object):
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.buckets[bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics(object):
+    def __init__(self, prefix: str = "pyalfred"):
+        """
+        Aggregates the metrics of requests measured by `MetricsMiddleware` per route and method, rendered in the
+        Prometheus text format by the endpoint of `make_endpoint`.
+        :param prefix: The prefix of the names of the metrics
+        """
+
+        self._prefix = prefix
+        self._lock = Lock()
+
+        self._latencies: Dict[Tuple[str, str], _Histogram] = dict()
+        self._requests: Dict[Tuple[str, str, int], int] = dict()
+        self._phases: Dict[Tuple[str, str, str], float] = dict()
+        self._statements: Dict[Tuple[str, str], int] = dict()
+        self._rows: Dict[Tuple[str, str], int] = dict()
+
+    def instrument(self, engine: Engine):
+        """
+        Counts and times the statements executed by `engine`, and counts the rows loaded by the ORM or affected by DML
+        statements, during measured requests.
+        """
+
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+        if not event.contains(Mapper, "load", _on_load):
+            event.listen(Mapper, "load", _on_load)
+
+    def observe(self, route: str, method: str, status: int, elapsed: float, metrics: RequestMetrics):
+        key = (route, method)
+
+        with self._lock:
+            self._latencies.setdefault(key, _Histogram()).observe(elapsed)
+            self._requests[(route, method, status)] = self._requests.get((route, method, status), 0) + 1
+
+            for name, value in metrics.phases.items():
+                self._phases[(route, method, name)] = self._phases.get((route, method, name), 0.0) + value
+
+            self._phases[(route, method, "db")] = self._phases.get((route, method, "db"), 0.0) + metrics.db
+            self._statements[key] = self._statements.get(key, 0) + metrics.statements
+            self._rows[key] = self._rows.get(key, 0) + metrics.rows
+
+    def render(self) -> str:
+        p = self._prefix
+        lines = list()
+
+        def labels(route, method, **kwargs):
+            extra = "".join(f',{k}="{_escape(v)}"' for k, v in kwargs.items())
+            return f'{{route="{_escape(route)}",method="{_escape(method)}"{extra}}}'
+
+        with self._lock:
+            lines.append(f"# HELP {p}_request_duration_seconds Latency of requests")
+            lines.append(f"# TYPE {p}_request_duration_seconds histogram")
+            for (route, method), histogram in sorted(self._latencies.items()):
+                cumulative = 0
+                for bound, n in zip(LATENCY_BUCKETS + (float("inf"),), histogram.buckets):
+                    cumulative += n
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{p}_request_duration_seconds_bucket{labels(route, method, le=le)} {cumulative:d}")
+
+                lines.append(f"{p}_request_duration_seconds_sum{labels(route, method)} {histogram.sum:.6f}")
+                lines.append(f"{p}_request_duration_seconds_count{labels(route, method)} {histogram.count:d}")
+
+            lines += [f"# HELP {p}_requests_total Number of requests", f"# TYPE {p}_requests_total counter"]
+            for (route, method, status), n in sorted(self._requests.items()):
+                lines.append(f"{p}_requests_total{labels(route, method, status=status)} {n:d}")
+
+            lines += [f"# HELP {p}_phase_seconds_total Time spent per phase", f"# TYPE {p}_phase_seconds_total counter"]
+            for (route, method, name), value in sorted(self._phases.items()):
+                lines.append(f"{p}_phase_seconds_total{labels(route, method, phase=name)} {value:.6f}")
+
+            counters = (
+                ("statements", "Number of executed SQL statements", self._statements),
+                ("rows", "Number of rows loaded or affected", self._rows),
+            )
+
+            for name, description, values in counters:
+                lines += [f"# HELP {p}_{name}_total {description}", f"# TYPE {p}_{name}_total counter"]
+                for (route, method), n in sorted(values.items()):
+                    lines.append(f"{p}_{name}_total{labels(route, method)} {n:d}")
+
+        return "\n".join(lines) + "\n"
+
+    def make_endpoint(self):
+        """
+        Implements an endpoint exposing the metrics in the Prometheus text format.
+        """
+
+        return type("MetricsResource", (MetricsResource,), {"metrics": self})
+
+
+class MetricsResource(HTTPEndpoint):
+    metrics = None
+
+    async def get(self, req: Request):
+        return PlainTextResponse(self.metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _get_route(scope) -> str:
+    # NB: Labelling by the route template rather than the path bounds the number of series, e.g. for path parameters
+    route = scope.get("route")
+
+    if route is None:
+        for candidate in getattr(scope.get("router"), "routes", ()):
+            if candidate.matches(scope)[0] == Match.FULL:
+                route = candidate
+                break
+
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # NB: A single value rather than a stack, as statements on a connection do not nest, and a failing statement never
+    # reaches `after_cursor_execute` but is overwritten by the next one
+    if _current.get() is not None:
+        conn.info["pyalfred_start"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = conn.info.pop("pyalfred_start", None)
+
+    metrics = _current.get()
+    if metrics is None or start is None:
+        return
+
+    metrics.db += time.perf_counter() - start
+    metrics.statements += 1
+
+    if context is not None and (context.isinsert or context.isupdate or context.isdelete) and cursor.rowcount > 0:
+        metrics.rows += cursor.rowcount
+
+
+def _on_load(target, context):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.rows += 1
+
+
+class MetricsMiddleware(object):
+    def __init__(self, app, metrics: Metrics, server_timing: bool = True):
+        """
+        Measures each request, adding a `Server-Timing` header to the response and aggregating the measurements in
+        `metrics`.
+        :param app: The ASGI application
+        :param metrics: The metrics to aggregate the measurements in
+        :param server_timing: Whether to add the `Server-Timing` header
+        """
+
+        self.app = app
+        self.metrics = metrics
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+
+            if message["type"] == "http.response.start":
+                status = message["status"]
+
+                if self.server_timing:
+                    timing = metrics.server_timing(time.perf_counter() - start)
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"server-timing", timing.encode("latin-1"))
+                    ]
+
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            self.metrics.observe(_get_route(scope), scope["method"], status, time.perf_counter() - start, metrics)
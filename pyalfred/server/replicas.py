@@ -0,0 +1,69 @@
+import random
+from itertools import count
+from typing import Union, List, Dict, Any
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import scoped_session, sessionmaker
+
+
+def get_engine(session_factory: Union[scoped_session, sessionmaker]) -> Engine:
+    if isinstance(session_factory, scoped_session):
+        session_factory = session_factory.session_factory
+
+    return session_factory.kw["bind"]
+
+
+def get_pool_status(session_factory: Union[scoped_session, sessionmaker]) -> Dict[str, Any]:
+    """
+    Returns the size, number of checked out connections and utilization of the connection pool backing
+    `session_factory`, where available for the type of pool.
+    """
+
+    pool = get_engine(session_factory).pool
+    status = {"pool": pool.__class__.__name__}
+
+    if not hasattr(pool, "checkedout"):
+        return status
+
+    size, checked_out = pool.size(), pool.checkedout()
+    capacity = size + max(getattr(pool, "_max_overflow", 0), 0)
+
+    status.update(
+        {
+            "size": size,
+            "checked_out": checked_out,
+            "overflow": max(pool.overflow(), 0),
+            "utilization": checked_out / capacity if capacity > 0 else None,
+        }
+    )
+
+    return status
+
+
+class ReplicaPolicy(object):
+    def choose(self, replicas: List[scoped_session]) -> scoped_session:
+        """
+        Selects the replica to run a read on.
+        """
+
+        raise NotImplementedError()
+
+
+class RoundRobin(ReplicaPolicy):
+    def __init__(self):
+        self._counter = count()
+
+    def choose(self, replicas: List[scoped_session]) -> scoped_session:
+        return replicas[next(self._counter) % len(replicas)]
+
+
+class Random(ReplicaPolicy):
+    def choose(self, replicas: List[scoped_session]) -> scoped_session:
+        return random.choice(replicas)
+
+
+class LeastUsed(ReplicaPolicy):
+    def choose(self, replicas: List[scoped_session]) -> scoped_session:
+        return min(replicas, key=lambda r: get_pool_status(r).get("checked_out", 0))
+
+
+POLICIES = {"round_robin": RoundRobin, "random": Random, "least_used": LeastUsed}
@@ -1,6 +1,33 @@
 import logging
-from typing import Sequence
+import json
+import gzip
+import hashlib
+from copy import copy
+from functools import lru_cache, partial
+from base64 import urlsafe_b64encode, urlsafe_b64decode
+from datetime import date, datetime, time
+from decimal import Decimal
+from enum import Enum
+from typing import Sequence, List, Tuple, Dict, Any, Optional
+from marshmallow import Schema, ValidationError, RAISE
+from sqlalchemy import inspect, and_, or_, tuple_, func, Table
+from sqlalchemy.engine import Dialect
+from sqlalchemy.sql.dml import Insert
 from sqlalchemy.orm import Query
+from sqlalchemy.sql import ClauseElement
+from query_serializer import QueryBuilder
+from pyalfred.constants import FILTER_CACHE_SIZE, AGGREGATES
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# NB: Ordered by preference, using moderate levels as responses are compressed on the fly
+ENCODINGS = {"gzip": partial(gzip.compress, compresslevel=6)}
+if brotli is not None:
+    ENCODINGS = {"br": partial(brotli.compress, quality=4), **ENCODINGS}
 
 
 def make_base_logger(name: str) -> logging.Logger:
@@ -18,9 +45,34 @@ def make_base_logger(name: str) -> logging.Logger:
     return logger
 
 
+class Operations(object):
+    def __init__(self):
+        """
+        Container for the parsed operations of a request.
+        """
+
+        self.order_by = list()
+        self.limit = None
+        self.first = False
+        self.page_size = None
+        self.after = None
+        self.for_update = False
+        self.skip_locked = False
+        self.nowait = False
+        self.group_by = list()
+        self.aggregates = list()
+
+    @property
+    def is_aggregate(self) -> bool:
+        return any(self.group_by) or any(self.aggregates)
+
+
 # TODO: Do better
-def apply_filter_from_string(model, query: Query, filters: Sequence[str]):
+def parse_operations(filters: Sequence[str]) -> Operations:
+    operations = Operations()
+
     for f in filters:
+        f = f.strip()
         as_lower = f.lower()
 
         if f == "":
@@ -38,21 +90,422 @@ def apply_filter_from_string(model, query: Query, filters: Sequence[str]):
                 else:
                     attribute_name = attribute_name.replace("descending", "")
 
-            to_order_on = getattr(model, attribute_name.strip())
-
-            if descending:
-                to_order_on = to_order_on.desc()
-
-            query = query.order_by(to_order_on)
+            operations.order_by.append((attribute_name.strip(), descending))
 
         elif as_lower == "first":
-            return query.first()
+            operations.first = True
 
         elif as_lower.startswith("limit"):
             to_limit = as_lower.replace("limit", "")
-            query = query.limit(int(to_limit.strip()))
+            operations.limit = int(to_limit.strip())
+
+        elif as_lower.startswith("page"):
+            operations.page_size = int(as_lower.replace("page", "").strip())
+
+        elif as_lower.startswith("after"):
+            # NB: The token is case sensitive
+            operations.after = f[len("after") :].strip()
+
+        elif as_lower == "for update":
+            operations.for_update = True
+
+        elif as_lower == "skip locked":
+            operations.for_update = operations.skip_locked = True
+
+        elif as_lower == "nowait":
+            operations.for_update = operations.nowait = True
+
+        elif as_lower == "count":
+            operations.aggregates.append(("count", None))
+
+        elif as_lower.startswith("group by"):
+            operations.group_by.append(as_lower.replace("group by", "").strip())
+
+        elif as_lower.split(" ", 1)[0] in AGGREGATES:
+            function, attribute_name = as_lower.split(" ", 1)
+            operations.aggregates.append((function, attribute_name.strip()))
 
         else:
             raise NotImplementedError(f"Have not implemented filter: {f}")
 
+    _validate_operations(operations)
+
+    return operations
+
+
+def _validate_operations(operations: Operations):
+    if operations.after is not None and operations.page_size is None:
+        raise ValueError("`after` requires `page` to be specified!")
+
+    # NB: Pages are bounded by their size, and a limit would otherwise silently be dropped
+    if operations.page_size is not None and (operations.limit is not None or operations.first):
+        raise ValueError("`page` cannot be combined with `limit` or `first`!")
+
+    if operations.is_aggregate and (operations.page_size is not None or operations.for_update):
+        raise ValueError("Aggregations cannot be combined with `page` or locking!")
+
+
+def normalize_operations(ops: str) -> str:
+    return ",".join(o.strip() for o in ops.split(",") if o.strip())
+
+
+@lru_cache(maxsize=FILTER_CACHE_SIZE)
+def _compile_operations(ops: str) -> Operations:
+    return parse_operations(ops.split(","))
+
+
+def compile_operations(ops: str) -> Operations:
+    """
+    Parses the comma separated operations in `ops`, caching the result on the normalized string. Note that the
+    returned object is shared and must not be mutated.
+    """
+
+    # NB: Page tokens differ between every page, so the token is kept out of the cached operations
+    after = None
+    rest = list()
+
+    for o in ops.split(","):
+        if o.strip().lower().startswith("after"):
+            after = o.strip()[len("after") :].strip()
+        else:
+            rest.append(o)
+
+    operations = _compile_operations(normalize_operations(",".join(rest)))
+    if after is None:
+        return operations
+
+    operations = copy(operations)
+    operations.after = after
+    _validate_operations(operations)
+
+    return operations
+
+
+@lru_cache(maxsize=FILTER_CACHE_SIZE)
+def _compile_filter(model, filter_: str) -> ClauseElement:
+    return QueryBuilder(model).from_string(Query(model), filter_).whereclause
+
+
+def compile_filter(model, filter_: str) -> ClauseElement:
+    """
+    Parses `filter_` into a SQLAlchemy expression on `model`, caching the result on the stripped string. Note that the
+    cache is keyed on the full filter including its literals, so only repeated identical filters skip the parsing,
+    while filters of the same shape with different literals are each parsed anew. The latter only share the compiled
+    SQL, as cached by SQLAlchemy regardless of this function.
+    """
+
+    return _compile_filter(model, filter_.strip())
+
+
+def _get_keyset(model, operations: Operations) -> List[Tuple[str, bool]]:
+    keyset = list(operations.order_by)
+    mapper = inspect(model)
+
+    for column in mapper.primary_key:
+        key = mapper.get_property_by_column(column).key
+
+        if all(key != k for k, _ in keyset):
+            keyset.append((key, False))
+
+    return keyset
+
+
+def _is_nullable(attribute) -> bool:
+    return getattr(attribute.expression, "nullable", True)
+
+
+def _to_token_value(value):
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    elif isinstance(value, Enum):
+        return value.name
+    elif isinstance(value, Decimal):
+        return str(value)
+
+    return value
+
+
+def _from_token_value(attribute, value):
+    try:
+        python_type = attribute.type.python_type
+    except NotImplementedError:
+        return value
+
+    if value is not None and python_type in (date, datetime, time):
+        return python_type.fromisoformat(value)
+    elif value is not None and python_type is Decimal:
+        return Decimal(value)
+
+    return value
+
+
+def make_page_token(model, operations: Operations, obj) -> str:
+    """
+    Creates an opaque continuation token from the ordering columns and primary key of `obj`, the last row of a page.
+    """
+
+    values = [_to_token_value(getattr(obj, k)) for k, _ in _get_keyset(model, operations)]
+
+    return urlsafe_b64encode(json.dumps(values).encode("utf-8")).decode("ascii")
+
+
+def _apply_page_token(model, query: Query, operations: Operations) -> Query:
+    keyset = _get_keyset(model, operations)
+    values = json.loads(urlsafe_b64decode(operations.after.encode("ascii")))
+
+    if len(values) != len(keyset):
+        raise ValueError("The page token does not match the ordering of the request!")
+
+    attributes = [getattr(model, k) for k, _ in keyset]
+    values = [_from_token_value(a, v) for a, v in zip(attributes, values)]
+
+    # NB: Row-wise comparison expanded to support mixed directions, i.e. (a > x) OR (a == x AND b > y) OR ... As NULLs
+    # are ordered last, they follow any value of a nullable column while nothing follows a NULL
+    clauses = list()
+    for i, (attribute, value, (_, descending)) in enumerate(zip(attributes, values, keyset)):
+        if value is None:
+            continue
+
+        equal = [a.is_(None) if v is None else a == v for a, v in zip(attributes[:i], values[:i])]
+        comparison = attribute < value if descending else attribute > value
+
+        if _is_nullable(attribute):
+            comparison = or_(comparison, attribute.is_(None))
+
+        clauses.append(and_(*equal, comparison))
+
+    return query.filter(or_(*clauses))
+
+
+def apply_operations(model, query: Query, operations: Operations) -> Query:
+    """
+    Applies `operations` to `query` without executing it. Note that `first` is translated to a limit of one, and that
+    a page of size `n` is translated to a limit of `n + 1` in order to determine whether there are more rows.
+    """
+
+    order_by = operations.order_by if operations.page_size is None else _get_keyset(model, operations)
+
+    for attribute_name, descending in order_by:
+        attribute = to_order_on = getattr(model, attribute_name)
+
+        if descending:
+            to_order_on = to_order_on.desc()
+
+        # NB: Pages order NULLs last regardless of direction, which the page token relies on
+        if operations.page_size is not None and _is_nullable(attribute):
+            to_order_on = to_order_on.nulls_last()
+
+        query = query.order_by(to_order_on)
+
+    if operations.after is not None:
+        query = _apply_page_token(model, query, operations)
+
+    if operations.for_update:
+        query = query.with_for_update(skip_locked=operations.skip_locked, nowait=operations.nowait)
+
+    if operations.first:
+        query = query.limit(1)
+    elif operations.page_size is not None:
+        query = query.limit(operations.page_size + 1)
+    elif operations.limit is not None:
+        query = query.limit(operations.limit)
+
+    return query
+
+
+def get_aggregate_label(function: str, attribute_name: str = None) -> str:
+    return function if attribute_name is None else f"{function}_{attribute_name}"
+
+
+def apply_aggregate_operations(model, query: Query, operations: Operations) -> Query:
+    """
+    Translates `query` into one selecting the grouping attributes and aggregates of `operations`, such that the
+    aggregation is done by the database. Ordering is supported on both grouping attributes and aggregate labels.
+    """
+
+    group_by = [getattr(model, c) for c in operations.group_by]
+
+    aggregates = dict()
+    for function, attribute_name in operations.aggregates:
+        label = get_aggregate_label(function, attribute_name)
+
+        # NB: Counts the primary key rather than `*` so that the table is part of the FROM clause
+        if function == "count":
+            expression = func.count(inspect(model).primary_key[0])
+        else:
+            expression = getattr(func, function)(getattr(model, attribute_name))
+
+        aggregates[label] = expression.label(label)
+
+    query = query.with_entities(*group_by, *aggregates.values())
+
+    if any(group_by):
+        query = query.group_by(*group_by)
+
+    for attribute_name, descending in operations.order_by:
+        to_order_on = aggregates[attribute_name] if attribute_name in aggregates else getattr(model, attribute_name)
+        query = query.order_by(to_order_on.desc() if descending else to_order_on)
+
+    if operations.first:
+        query = query.limit(1)
+    elif operations.limit is not None:
+        query = query.limit(operations.limit)
+
+    return query
+
+
+def apply_filter_from_string(model, query: Query, filters: Sequence[str]):
+    operations = parse_operations(filters)
+    query = apply_operations(model, query, operations)
+
+    if operations.first:
+        return query.first()
+
     return query.all()
+
+
+def get_column_keys(model) -> Dict[str, str]:
+    """
+    Maps the attribute keys of the column properties of `model` to the keys of the underlying table columns.
+    """
+
+    return {p.key: p.columns[0].key for p in inspect(model).column_attrs}
+
+
+def load_records(schema: Schema, data: List[Dict[str, Any]], model) -> List[Dict[str, Any]]:
+    """
+    Validates and deserializes `data` into plain dictionaries keyed on the table columns of `model`, without creating
+    any ORM instances. Fields that are dump only are skipped, and only the keys present in each record are loaded.
+    As for `schema.load`, required fields must be present unless `schema` is partial, and unknown keys are rejected
+    unless `schema` excludes them. Relationships are rejected as they cannot be written in bulk. Note that validators
+    and hooks of the schema itself are not run.
+    """
+
+    columns = get_column_keys(model)
+    fields = {k: (f.data_key or k, f) for k, f in schema.load_fields.items() if k in columns}
+
+    partial = schema.partial
+    required = [
+        (key, field)
+        for name, (key, field) in fields.items()
+        if field.required and not (partial is True or (partial and name in partial))
+    ]
+
+    declared = {f.data_key or k: k for k, f in schema.declared_fields.items()}
+    unsupported = [k for k in schema.load_fields if k not in columns]
+
+    records = list()
+    errors = dict()
+
+    for i, d in enumerate(data):
+        record = dict()
+
+        for key in d:
+            if key not in declared:
+                if schema.unknown == RAISE:
+                    errors.setdefault(i, dict())[key] = ["Unknown field."]
+            elif declared[key] in unsupported:
+                errors.setdefault(i, dict())[key] = ["Relationships are not supported by bulk writes."]
+
+        for key, field in required:
+            if key not in d:
+                errors.setdefault(i, dict())[key] = field.make_error("required").messages
+
+        for name, (key, field) in fields.items():
+            if key not in d:
+                continue
+
+            try:
+                record[columns[name]] = field.deserialize(d[key], key, d)
+            except ValidationError as e:
+                errors.setdefault(i, dict())[key] = e.messages
+
+        records.append(record)
+
+    if errors:
+        raise ValidationError(errors)
+
+    return records
+
+
+def filter_by_primary_keys(model, query: Query, keys: Sequence[tuple]) -> Query:
+    """
+    Filters `query` on the primary key tuples in `keys`, using a row value comparison for composite keys.
+    """
+
+    columns = inspect(model).primary_key
+
+    if len(columns) == 1:
+        return query.filter(columns[0].in_([k[0] for k in keys]))
+
+    return query.filter(tuple_(*columns).in_(keys))
+
+
+def make_upsert_statement(table: Table, dialect: Dialect, conflict: List[str], to_update: List[str]) -> Insert:
+    """
+    Creates an `INSERT ... ON CONFLICT` statement for `table`, updating the columns `to_update` of rows conflicting on
+    the columns `conflict`. Only supported for SQLite and Postgres.
+    """
+
+    if dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"Upserts are not supported for dialect: {dialect.name}")
+
+    statement = insert(table)
+
+    # NB: Rather than doing nothing we update the conflicting columns with themselves, so that RETURNING yields a row
+    set_ = {c: statement.excluded[c] for c in (to_update or conflict)}
+
+    return statement.on_conflict_do_update(index_elements=[table.c[c] for c in conflict], set_=set_)
+
+
+def negotiate_encoding(accept_encoding: str = None) -> Optional[str]:
+    """
+    Selects the supported content coding with the highest quality in the `Accept-Encoding` header, if any.
+    """
+
+    qualities = dict()
+    for part in (accept_encoding or "").split(","):
+        coding, *parameters = [p.strip() for p in part.split(";")]
+
+        quality = 1.0
+        for p in parameters:
+            if p.startswith("q="):
+                try:
+                    quality = float(p[2:])
+                except ValueError:
+                    quality = 0.0
+
+        qualities[coding.lower()] = quality
+
+    candidates = [(-qualities.get(c, qualities.get("*", 0.0)), i, c) for i, c in enumerate(ENCODINGS)]
+    candidates = [c for c in sorted(candidates) if c[0] < 0.0]
+
+    return candidates[0][-1] if any(candidates) else None
+
+
+def compress(content: bytes, encoding: str) -> bytes:
+    return ENCODINGS[encoding](content)
+
+
+def make_etag(content: bytes) -> str:
+    """
+    Creates a weak entity tag from `content`, weak as the representation may be compressed differently.
+    """
+
+    return f'W/"{hashlib.blake2b(content, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(etag: str, if_none_match: str = None) -> bool:
+    if not if_none_match:
+        return False
+
+    def opaque(tag: str) -> str:
+        return tag[2:] if tag.startswith("W/") else tag
+
+    tags = [t.strip() for t in if_none_match.split(",")]
+
+    return "*" in tags or any(opaque(t) == opaque(etag) for t in tags)
@@ -24,8 +24,16 @@ setup(
     install_requires=[
         "auto_schema @ git+https://github.com/tingiskhan/auto-schema#egg=auto_schema",
         "query-serializer @ git+https://github.com/tingiskhan/query-serializer#egg=query_serializer",
-        "sqlalchemy",
+        "sqlalchemy>=2.0.10",
+        "marshmallow",
         "starlette",
+        "anyio",
         "pyparsing",
+        "requests",
+        "httpx",
     ],
+    extras_require={
+        "fast": ["orjson", "msgpack", "brotli"],
+        "arrow": ["pyarrow"],
+    },
 )
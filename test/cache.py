@@ -0,0 +1,64 @@
+import unittest
+from pyalfred.server.cache import MemoryCache, RedisCache
+
+
+class DictClient(object):
+    # NB: Implements the subset of `redis.Redis` used by `RedisCache`
+    def __init__(self):
+        self.values = dict()
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value, ex=None, nx=False):
+        if not (nx and key in self.values):
+            self.values[key] = value.encode("utf-8") if isinstance(value, str) else value
+
+    def incr(self, key):
+        self.values[key] = str(int(self.values.get(key, 0)) + 1).encode("utf-8")
+
+
+class MemoryCacheTest(unittest.TestCase):
+    def test_EvictsLeastRecentlyUsed(self):
+        cache = MemoryCache(max_size=2)
+
+        cache.set("task", 0, "a", b"a")
+        cache.set("task", 0, "b", b"b")
+        cache.get("task", 0, "a")
+        cache.set("task", 0, "c", b"c")
+
+        self.assertEqual(b"a", cache.get("task", 0, "a"))
+        self.assertIsNone(cache.get("task", 0, "b"))
+        self.assertEqual({"hits": 2, "misses": 1, "size": 2}, cache.stats())
+
+    def test_InvalidateDiscardsStaleWrites(self):
+        cache = MemoryCache()
+
+        version = cache.version("task")
+        cache.invalidate("task")
+        cache.set("task", version, "a", b"stale")
+
+        self.assertIsNone(cache.get("task", cache.version("task"), "a"))
+        self.assertIsNone(cache.get("task", version, "a"))
+
+    def test_EpochsDifferBetweenCaches(self):
+        first, second = MemoryCache(), MemoryCache()
+
+        self.assertEqual(first.epoch("task"), first.epoch("task"))
+        self.assertNotEqual(first.epoch("task"), second.epoch("task"))
+
+
+class RedisCacheTest(unittest.TestCase):
+    def test_EpochIsSharedUntilLost(self):
+        client = DictClient()
+        first, second = RedisCache(client), RedisCache(client)
+
+        epoch = first.epoch("task")
+        self.assertEqual(epoch, second.epoch("task"))
+
+        client.values.clear()
+        self.assertNotEqual(epoch, second.epoch("task"))
+
+
+if __name__ == "__main__":
+    unittest.main()
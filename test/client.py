@@ -0,0 +1,126 @@
+import os
+import asyncio
+import tempfile
+import unittest
+from datetime import date
+from unittest.mock import patch
+import httpx
+from sqlalchemy import create_engine
+from sqlalchemy.orm import scoped_session, sessionmaker
+from starlette.applications import Starlette
+from auto_schema import AutoMarshmallowSchema
+from pyalfred.server import DatabaseResource
+from pyalfred.contract.client import AsyncClient
+from test.model import Base, Task, TaskType
+
+
+class DelayedClient(AsyncClient):
+    # NB: Delays earlier requests the longest, such that chunks complete in the reverse order of being sent
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        self.sent = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def _send(self, method, endpoint, params=None, **kwargs):
+        self.sent += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+        try:
+            await asyncio.sleep(0.05 / self.sent)
+            return await super()._send(method, endpoint, params=params, **kwargs)
+        finally:
+            self.in_flight -= 1
+
+
+class AsyncClientTest(unittest.TestCase):
+    def setUp(self):
+        # NB: A file, rather than a single shared in-memory connection, so that the chunks may run concurrently
+        path = os.path.join(tempfile.mkdtemp(), "client.db")
+        self.engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False, "timeout": 60})
+        Base.metadata.create_all(self.engine)
+
+        self.session_factory = scoped_session(sessionmaker(bind=self.engine))
+
+        self.app = Starlette()
+        schema = AutoMarshmallowSchema.generate_schema(Task)
+        self.app.add_route("/task", DatabaseResource.make_endpoint(schema, self.session_factory, create_ignore=["id"]))
+
+        patcher = patch("pyalfred.contract.client.asynchronous.INTERFACE_CHUNK_SIZE", 2)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.engine.dispose()
+
+    def _run(self, f):
+        async def run():
+            client = DelayedClient("http://test", max_in_flight=3)
+            headers = client._client.headers
+
+            await client.close()
+            client._client = httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=self.app), base_url="http://test", headers=headers
+            )
+
+            async with client:
+                return client, await f(client)
+
+        return asyncio.run(run())
+
+    def _stored(self):
+        session = self.session_factory()
+
+        try:
+            return {t.name: t.id for t in session.query(Task)}
+        finally:
+            self.session_factory.remove()
+
+    @staticmethod
+    def _make_tasks(n: int):
+        return [Task(name=f"task-{i}", finished_by=date.today(), type=TaskType.Task) for i in range(n)]
+
+    def test_CreateKeepsOrder(self):
+        tasks = self._make_tasks(7)
+        client, created = self._run(lambda c: c.create(tasks, load_only=["id"]))
+
+        self.assertEqual(4, client.sent)
+        self.assertEqual(3, client.max_in_flight)
+        self.assertEqual([t.name for t in tasks], [t.name for t in created])
+
+        stored = self._stored()
+        self.assertEqual([stored[t.name] for t in created], [t.id for t in created])
+
+    def test_BulkBatchedSetsKeys(self):
+        tasks = self._make_tasks(7)
+        client, created = self._run(lambda c: c.create(tasks, bulk=True, batched=True))
+
+        self.assertEqual(4, client.sent)
+        self.assertIs(tasks[0], created[0])
+
+        stored = self._stored()
+        self.assertEqual(len(tasks), len(stored))
+        self.assertEqual([stored[t.name] for t in tasks], [t.id for t in tasks])
+
+    def test_UpdateAndDelete(self):
+        tasks = self._make_tasks(7)
+        self._run(lambda c: c.create(tasks, bulk=True, batched=True))
+
+        for t in tasks:
+            t.name = f"renamed-{t.id}"
+
+        _, updated = self._run(lambda c: c.update(tasks, bulk=True, only=["name"]))
+
+        self.assertEqual([t.id for t in tasks], [t.id for t in updated])
+        self.assertEqual({t.name: t.id for t in tasks}, self._stored())
+
+        client, deleted = self._run(lambda c: c.delete(tasks))
+
+        self.assertEqual((4, 7), (client.sent, deleted))
+        self.assertEqual(dict(), self._stored())
+
+
+if __name__ == "__main__":
+    unittest.main()
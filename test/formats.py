@@ -0,0 +1,51 @@
+import unittest
+from datetime import date
+from pyalfred.contract.formats import JSON, FORMATS, negotiate_format, get_format, msgpack, pyarrow
+
+MSGPACK = "application/msgpack"
+ARROW = "application/vnd.apache.arrow.stream"
+
+
+class FormatsTest(unittest.TestCase):
+    def setUp(self):
+        self.records = [{"id": i, "name": f"task-{i}", "finished_by": date.today().isoformat()} for i in range(3)]
+
+    def test_DefaultsToJSON(self):
+        for accept in (None, "", "*/*", "text/html", "application/xml;q=0.9"):
+            self.assertIs(JSON, negotiate_format(accept))
+
+        self.assertIs(JSON, get_format("text/plain"))
+        self.assertIs(JSON, get_format("application/json; charset=utf-8"))
+
+    @unittest.skipIf(msgpack is None, "Requires msgpack")
+    def test_NegotiatesByQuality(self):
+        msgpack_ = FORMATS[MSGPACK]
+
+        self.assertIs(msgpack_, negotiate_format(MSGPACK))
+        self.assertIs(msgpack_, negotiate_format(f"application/json;q=0.5, {MSGPACK}"))
+        self.assertIs(JSON, negotiate_format(f"{MSGPACK};q=0.5, application/json"))
+        self.assertIs(JSON, negotiate_format(f"application/json, {MSGPACK}"))
+        self.assertIs(msgpack_, negotiate_format(f"text/html, {MSGPACK};q=0.1"))
+        self.assertIs(JSON, negotiate_format(f"{MSGPACK};q=0"))
+        self.assertIs(JSON, negotiate_format(f"{MSGPACK};q=high"))
+
+    @unittest.skipIf(msgpack is None, "Requires msgpack")
+    def test_MsgPackRoundTrip(self):
+        format_ = FORMATS[MSGPACK]
+
+        for media in (self.records, {"deleted": 3}, []):
+            self.assertEqual(media, format_.decode(format_.encode(media)))
+
+        self.assertIs(format_, get_format(MSGPACK))
+
+    @unittest.skipIf(pyarrow is None, "Requires pyarrow")
+    def test_ArrowRoundTrip(self):
+        format_ = FORMATS[ARROW]
+
+        self.assertTrue(format_.tabular)
+        self.assertEqual(self.records, format_.decode(format_.encode(self.records)))
+        self.assertIs(format_, negotiate_format(f"{ARROW}, application/json;q=0.9"))
+
+
+if __name__ == "__main__":
+    unittest.main()
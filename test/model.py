@@ -38,3 +38,10 @@ class Attachment(Base):
     id = Column(Integer, primary_key=True, autoincrement=True)
     task_id = Column(Integer, ForeignKey(TaskWithRelationShip.id), nullable=False)
     location = Column(String, nullable=False)
+
+
+class Reminder(Base):
+    __tablename__ = "reminder"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    due = Column(Date, nullable=True)
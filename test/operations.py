@@ -0,0 +1,103 @@
+import unittest
+from datetime import date, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from pyalfred.server.utils import (
+    parse_operations,
+    compile_operations,
+    apply_operations,
+    make_page_token,
+    apply_aggregate_operations,
+    _compile_operations,
+)
+from test.model import Base, Task, TaskType, Reminder
+
+
+class OperationsTest(unittest.TestCase):
+    def setUp(self):
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+
+        self.session = sessionmaker(bind=engine)()
+        self.session.add_all(
+            Task(name=f"task-{i:02d}", finished_by=date(2020, 1, 1) + timedelta(days=i % 3), type=TaskType.Task)
+            for i in range(25)
+        )
+        self.session.commit()
+
+    def tearDown(self):
+        self.session.close()
+
+    def _iterate_pages(self, ops: str, model=Task):
+        pages = list()
+        token = None
+
+        while True:
+            operations = parse_operations((ops + (f",after {token}" if token else "")).split(","))
+            result = apply_operations(model, self.session.query(model), operations).all()
+
+            if len(result) <= operations.page_size:
+                pages.append(result)
+                return pages
+
+            result = result[: operations.page_size]
+            pages.append(result)
+            token = make_page_token(model, operations, result[-1])
+
+    def test_ParseOperations(self):
+        operations = parse_operations(["order by name desc", "page 5", "after AbC"])
+
+        self.assertEqual([("name", True)], operations.order_by)
+        self.assertEqual(5, operations.page_size)
+        self.assertEqual("AbC", operations.after)
+        self.assertEqual(10, parse_operations(["order by name desc", "limit 10"]).limit)
+
+    def test_CompileOperations(self):
+        size = _compile_operations.cache_info().currsize
+
+        first = compile_operations("order by name desc, page 5, after AbC")
+        second = compile_operations("order by name desc,page 5,after dEf")
+
+        self.assertEqual(("AbC", "dEf"), (first.after, second.after))
+        self.assertLessEqual(_compile_operations.cache_info().currsize, size + 1)
+        self.assertIsNone(compile_operations("order by name desc,page 5").after)
+        operations = compile_operations("order by name desc,page 5")
+        self.assertIs(operations, compile_operations(" order by name desc, page 5"))
+
+        with self.assertRaises(ValueError):
+            compile_operations("order by name,after AbC")
+
+        for ops in ("page 5,limit 10", "first,page 5"):
+            with self.assertRaises(ValueError):
+                compile_operations(ops)
+
+    def test_KeysetPagination(self):
+        expected = self.session.query(Task).order_by(Task.finished_by.desc(), Task.id).all()
+        pages = self._iterate_pages("order by finished_by desc,page 7")
+
+        self.assertEqual([7, 7, 7, 4], [len(p) for p in pages])
+        self.assertEqual(expected, [t for p in pages for t in p])
+
+    def test_KeysetPaginationWithNulls(self):
+        dues = [date(2020, 1, 1) + timedelta(days=i % 3) if i % 4 else None for i in range(10)]
+        self.session.add_all(Reminder(due=due) for due in dues)
+        self.session.commit()
+
+        for direction in ("", " desc"):
+            due = Reminder.due.desc() if direction else Reminder.due
+            expected = self.session.query(Reminder).order_by(due.nulls_last(), Reminder.id).all()
+            pages = self._iterate_pages(f"order by due{direction},page 3", Reminder)
+
+            self.assertEqual([3, 3, 3, 1], [len(p) for p in pages])
+            self.assertEqual(expected, [r for p in pages for r in p])
+
+    def test_AggregateOperations(self):
+        operations = parse_operations(["group by finished_by", "count", "max id", "order by count desc"])
+        result = apply_aggregate_operations(Task, self.session.query(Task), operations).all()
+
+        self.assertEqual([9, 8, 8], [r[1] for r in result])
+        self.assertEqual(25, max(r[2] for r in result))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+from datetime import date
+from auto_schema import AutoMarshmallowSchema
+from pyalfred.contract.schemas import get_schema_instance, get_dumper, compile_dumper, LazySchema
+from test.model import Task, TaskType, TaskWithRelationShip
+
+
+class SchemaTest(unittest.TestCase):
+    def setUp(self):
+        self.schema = AutoMarshmallowSchema.generate_schema(Task)
+
+    def test_ReusesInstances(self):
+        instance = get_schema_instance(self.schema, many=True, only=["id", "name"])
+
+        self.assertIs(instance, get_schema_instance(self.schema, only=("id", "name"), many=True))
+        self.assertIsNot(instance, get_schema_instance(self.schema, many=True, only=["id"]))
+        self.assertTrue(instance.many)
+
+    def test_CompiledDumperMatchesSchema(self):
+        objects = [Task(id=i, name=f"task-{i}", finished_by=date.today(), type=TaskType.Task) for i in range(3)]
+        objects.append(Task(id=3, name="task-3"))
+
+        for options in ({}, {"only": ["id", "type"]}, {"exclude": ["name"]}):
+            expected = self.schema(many=True, **options).dump(objects)
+            self.assertEqual(expected, get_dumper(self.schema, many=True, **options)(objects))
+
+        self.assertEqual({"id": 1}, get_dumper(self.schema, many=False, only=["id"])({"id": 1}))
+
+    def test_DoesNotCompileRelationships(self):
+        schema = AutoMarshmallowSchema.generate_schema(TaskWithRelationShip)
+
+        self.assertIsNone(compile_dumper(schema()))
+        self.assertIsNotNone(compile_dumper(schema(exclude=["attachments"])))
+
+    def test_LazySchema(self):
+        class Resource(object):
+            schema = LazySchema(Task)
+
+        self.assertIs(self.schema, Resource.schema)
+        self.assertIs(self.schema, Resource().schema)
+
+
+if __name__ == "__main__":
+    unittest.main()
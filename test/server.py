@@ -0,0 +1,597 @@
+import json
+import time
+import asyncio
+import unittest
+import httpx
+from datetime import date
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.pool import StaticPool
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.testclient import TestClient
+from auto_schema import AutoMarshmallowSchema
+from pyalfred.server import DatabaseResource, BatchResource, MemoryCache, Metrics, MetricsMiddleware, AdmissionControl
+from pyalfred.server.changes import Change
+from pyalfred.server.metrics import RequestMetrics
+from pyalfred.contract.formats import FORMATS, pyarrow
+from test.model import Base, Task, TaskWithRelationShip, Attachment, TaskType
+
+
+class DatabaseResourceTest(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(self.engine)
+        Change.__table__.create(self.engine)
+
+        self.session_factory = scoped_session(sessionmaker(bind=self.engine))
+
+        app = Starlette()
+        schema = AutoMarshmallowSchema.generate_schema(TaskWithRelationShip)
+        task = self.task = DatabaseResource.make_endpoint(schema, self.session_factory, create_ignore=["id"])
+        app.add_route("/task", task)
+        app.add_route(
+            "/cached", DatabaseResource.make_endpoint(schema, self.session_factory, cache=MemoryCache())
+        )
+
+        attachment_schema = AutoMarshmallowSchema.generate_schema(Attachment)
+        attachment = DatabaseResource.make_endpoint(attachment_schema, self.session_factory, create_ignore=["id"])
+        app.add_route(
+            "/tracked",
+            DatabaseResource.make_endpoint(schema, self.session_factory, create_ignore=["id"], track_changes=True),
+        )
+        app.add_route("/_batch", BatchResource.make_endpoint([task, attachment]), methods=["POST"])
+
+        self.client = TestClient(app)
+
+        self.statements = list()
+        event.listen(self.engine, "before_cursor_execute", self._count)
+
+    def tearDown(self):
+        event.remove(self.engine, "before_cursor_execute", self._count)
+        self.engine.dispose()
+
+    def _count(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def _add_tasks(self, start: int, n: int):
+        session = self.session_factory()
+
+        for i in range(start, start + n):
+            task = TaskWithRelationShip(name=f"task-{i}", finished_by=date.today(), type=TaskType.Task)
+            task.attachments = [Attachment(location=f"location-{i}-{j}") for j in range(2)]
+            session.add(task)
+
+        session.commit()
+        self.session_factory.remove()
+
+    def _count_selects(self, *args, **kwargs):
+        self.statements.clear()
+        resp = self.client.get("/task", *args, **kwargs)
+        self.assertEqual(200, resp.status_code)
+
+        return resp.json(), sum(s.lstrip().upper().startswith("SELECT") for s in self.statements)
+
+    def test_ConstantNumberOfQueriesOnGet(self):
+        self._add_tasks(0, 5)
+        few, few_queries = self._count_selects()
+
+        self._add_tasks(5, 45)
+        many, many_queries = self._count_selects()
+
+        self.assertEqual(5, len(few))
+        self.assertEqual(50, len(many))
+        self.assertTrue(all(len(t["attachments"]) == 2 for t in many))
+        self.assertEqual(few_queries, many_queries)
+
+    def test_ExcludeRelationships(self):
+        self._add_tasks(0, 5)
+        result, queries = self._count_selects(params={"relations": "none"})
+
+        self.assertTrue(all("attachments" not in t for t in result))
+        self.assertEqual(1, queries)
+
+    def test_SparseFieldsets(self):
+        self._add_tasks(0, 3)
+        result, queries = self._count_selects(params={"fields": "name"})
+
+        self.assertEqual([{"id", "name"}] * 3, [set(t.keys()) for t in result])
+        self.assertEqual(1, queries)
+
+        select = self.statements[-1].split("FROM")[0]
+        self.assertIn("name", select)
+        self.assertNotIn("finished_by", select)
+        self.assertNotIn("type", select)
+
+        result, _ = self._count_selects(params={"fields": "name,attachments"})
+        self.assertEqual([{"id", "name", "attachments"}] * 3, [set(t.keys()) for t in result])
+        self.assertTrue(all(len(t["attachments"]) == 2 for t in result))
+
+    def test_ConditionalGet(self):
+        self._add_tasks(0, 5)
+        etags = dict()
+
+        for route in ("/task", "/cached"):
+            etags[route] = self.client.get(route).headers["ETag"]
+
+            self.statements.clear()
+            resp = self.client.get(route, headers={"If-None-Match": etags[route]})
+
+            self.assertEqual(304, resp.status_code)
+            self.assertEqual(route == "/task", any(self.statements))
+
+        self.assertEqual(200, self.client.delete("/cached", params={"id": 1}).status_code)
+
+        for route in ("/task", "/cached"):
+            resp = self.client.get(route, headers={"If-None-Match": etags[route]})
+
+            self.assertEqual(200, resp.status_code)
+            self.assertEqual(4, len(resp.json()))
+
+    def test_ConditionalGetAcrossCaches(self):
+        self._add_tasks(0, 2)
+        etag = self.client.get("/cached").headers["ETag"]
+
+        self.assertEqual(200, self.client.delete("/cached", params={"id": 1}).status_code)
+
+        # NB: Another worker, or a restart, starts its cache over at the same version
+        app = Starlette()
+        schema = AutoMarshmallowSchema.generate_schema(TaskWithRelationShip)
+        app.add_route("/cached", DatabaseResource.make_endpoint(schema, self.session_factory, cache=MemoryCache()))
+
+        resp = TestClient(app).get("/cached", headers={"If-None-Match": etag})
+
+        self.assertEqual(200, resp.status_code)
+        self.assertEqual(1, len(resp.json()))
+
+    def test_CompressLargeResponses(self):
+        self._add_tasks(0, 1)
+        resp = self.client.get("/task", headers={"Accept-Encoding": "gzip"})
+        self.assertNotIn("Content-Encoding", resp.headers)
+
+        self._add_tasks(1, 50)
+        resp = self.client.get("/task", headers={"Accept-Encoding": "gzip"})
+
+        self.assertEqual("gzip", resp.headers["Content-Encoding"])
+        self.assertEqual(51, len(resp.json()))
+
+    def _make_batch(self, location: str = "location"):
+        task = {"name": "task", "finished_by": date.today().isoformat(), "type": TaskType.Task.value}
+        attachment = {"task_id": {"$ref": [0, 0, "id"]}, "location": location}
+
+        return [
+            {"op": "create", "model": "task_with_relationship", "data": [task]},
+            {"op": "create", "model": "attchment", "data": [attachment, attachment], "batched": True},
+        ]
+
+    @unittest.skipIf(pyarrow is None, "Requires pyarrow")
+    def test_ArrowFallsBackToJSON(self):
+        self._add_tasks(0, 3)
+
+        arrow = FORMATS["application/vnd.apache.arrow.stream"]
+        headers = {"Accept": arrow.media_type}
+
+        resp = self.client.get("/task", params={"relations": "none"}, headers=headers)
+        self.assertEqual(arrow.media_type, resp.headers["content-type"])
+        self.assertEqual(self.client.get("/task", params={"relations": "none"}).json(), arrow.decode(resp.content))
+
+        # NB: Only lists of records are tabular
+        resp = self.client.delete("/task", params={"id": 1}, headers=headers)
+        self.assertEqual("application/json", resp.headers["content-type"])
+        self.assertEqual({"deleted": 1}, resp.json())
+
+    def test_Batch(self):
+        resp = self.client.post("/_batch", json=self._make_batch())
+        self.assertEqual(200, resp.status_code)
+
+        tasks, attachments = resp.json()
+        self.assertEqual([{"id": 1}, {"id": 2}], attachments)
+
+        result = self.client.get("/task").json()
+        self.assertEqual([t["id"] for t in tasks], [t["id"] for t in result])
+        self.assertEqual(2, len(result[0]["attachments"]))
+
+    def test_BatchIsAtomic(self):
+        resp = self.client.post("/_batch", json=self._make_batch(location=None))
+
+        self.assertEqual(500, resp.status_code)
+        self.assertIn("operation 1", resp.json())
+        self.assertEqual([], self.client.get("/task").json())
+
+    def test_Stream(self):
+        self._add_tasks(0, 3)
+        expected = self.client.get("/task").json()
+
+        resp = self.client.get("/task", params={"stream": "true"})
+        self.assertEqual("application/json", resp.headers["Content-Type"])
+        self.assertEqual(expected, resp.json())
+
+        resp = self.client.get("/task", params={"stream": "true"}, headers={"Accept": "application/x-ndjson"})
+        self.assertEqual("application/x-ndjson", resp.headers["Content-Type"])
+        self.assertEqual(expected, [json.loads(line) for line in resp.text.splitlines()])
+
+        self.assertEqual(0, self.task.limiter.borrowed_tokens)
+
+    def test_StreamAbortsOnError(self):
+        self._add_tasks(0, 3)
+
+        def fail(conn, cursor, statement, parameters, context, executemany):
+            raise RuntimeError("Lost connection")
+
+        event.listen(self.engine, "before_cursor_execute", fail)
+
+        try:
+            with self.assertRaises(Exception):
+                self.client.get("/task", params={"stream": "true"}, headers={"Accept": "application/x-ndjson"})
+        finally:
+            event.remove(self.engine, "before_cursor_execute", fail)
+
+        self.assertEqual(0, self.task.limiter.borrowed_tokens)
+
+    def test_SparseUpdate(self):
+        self._add_tasks(0, 2)
+        before = self.client.get("/task").json()
+
+        resp = self.client.patch("/task", json=[{"id": before[0]["id"], "name": "renamed"}])
+        self.assertEqual(200, resp.status_code)
+
+        data = [{"id": before[1]["id"], "name": "other"}]
+        batch = [{"op": "update", "model": "task_with_relationship", "data": data}]
+        self.assertEqual(200, self.client.post("/_batch", json=batch).status_code)
+
+        after = self.client.get("/task").json()
+        self.assertEqual(["renamed", "other"], [t["name"] for t in after])
+
+        for old, new in zip(before, after):
+            self.assertEqual({**old, "name": new["name"]}, new)
+
+    def test_BulkInsert(self):
+        tasks = [
+            {"name": f"task-{i}", "finished_by": date.today().isoformat(), "type": TaskType.Task.value}
+            for i in range(4)
+        ]
+
+        # NB: Records specifying the key are inserted in a separate statement from those that do not
+        for i in (1, 3):
+            tasks[i]["id"] = 10 * i
+
+        created = self.client.put("/cached", params={"bulk": "true"}, json=tasks).json()
+
+        self.assertEqual([t["name"] for t in tasks], [t["name"] for t in created])
+        self.assertEqual([10, 30], [created[1]["id"], created[3]["id"]])
+
+        stored = self.client.get("/cached", params={"ops": "order by name"}).json()
+        self.assertEqual([{**t, "attachments": []} for t in created], stored)
+
+        tasks = [{**t, "name": f"other-{i}"} for i, t in enumerate(tasks) if "id" not in t]
+        created = self.client.put("/cached", params={"bulk": "true", "batched": "true"}, json=tasks).json()
+
+        self.assertEqual([{"id": 31}, {"id": 32}], created)
+
+    def test_Upsert(self):
+        self._add_tasks(0, 2)
+        before = self.client.get("/task").json()
+
+        tasks = [
+            {"name": "task-1", "finished_by": "2000-01-01", "type": TaskType.Note.value},
+            {"name": "task-2", "finished_by": "2000-01-02", "type": TaskType.Task.value},
+        ]
+
+        resp = self.client.put("/task", params={"upsert": "true", "conflict": "name"}, json=tasks)
+        self.assertEqual(200, resp.status_code)
+
+        upserted = resp.json()
+        self.assertEqual(before[1]["id"], upserted[0]["id"])
+        self.assertNotIn(upserted[1]["id"], [t["id"] for t in before])
+
+        after = self.client.get("/task", params={"ops": "order by id"}).json()
+        self.assertEqual(before[0], after[0])
+        self.assertEqual(upserted, [{k: v for k, v in t.items() if k != "attachments"} for t in after[1:]])
+        self.assertEqual(("2000-01-01", TaskType.Note.value), (after[1]["finished_by"], after[1]["type"]))
+
+    def test_UpsertOnIgnoredPrimaryKey(self):
+        self._add_tasks(0, 2)
+        before = self.client.get("/task").json()
+
+        tasks = [
+            {"id": before[0]["id"], "name": "renamed", "finished_by": "2000-01-01", "type": TaskType.Task.value},
+            {"id": None, "name": "new", "finished_by": "2000-01-02", "type": TaskType.Task.value},
+        ]
+
+        # NB: The primary key is the default conflict target, despite being ignored on create
+        upserted = self.client.put("/task", params={"upsert": "true"}, json=tasks).json()
+
+        self.assertEqual(before[0]["id"], upserted[0]["id"])
+        self.assertNotIn(upserted[1]["id"], [t["id"] for t in before])
+        self.assertEqual(["renamed", before[1]["name"], "new"], [t["name"] for t in self.client.get("/task").json()])
+
+    def test_BulkUpdate(self):
+        self._add_tasks(0, 3)
+        before = self.client.get("/task").json()
+
+        data = [{"id": before[0]["id"], "name": "renamed"}, {"id": before[2]["id"], "type": TaskType.Note.value}]
+        resp = self.client.patch("/task", params={"bulk": "true"}, json=data)
+
+        self.assertEqual(200, resp.status_code)
+        self.assertEqual([before[0]["id"], before[2]["id"]], [t["id"] for t in resp.json()])
+
+        after = self.client.get("/task").json()
+        self.assertEqual([{**before[0], "name": "renamed"}, before[1], {**before[2], "type": "Note"}], after)
+
+        # NB: Unlike the merge path, which would insert them, keys matching no row fail the whole request
+        data = [{"id": before[1]["id"], "name": "other"}, {"id": 1000, "name": "missing"}]
+        resp = self.client.patch("/task", params={"bulk": "true"}, json=data)
+
+        self.assertEqual(500, resp.status_code)
+        self.assertIn("1000", resp.json())
+        self.assertEqual(after, self.client.get("/task").json())
+
+    def test_InvalidBulkInput(self):
+        resp = self.client.put("/task", params={"bulk": "true"}, json=[{"name": "task", "type": "unknown"}])
+
+        self.assertEqual(500, resp.status_code)
+        self.assertTrue(resp.json().startswith("ValidationError"))
+        self.assertEqual([], self.client.get("/task").json())
+
+        resp = self.client.patch("/task", params={"bulk": "true"}, json=[{"id": 1, "finished_by": "yesterday"}])
+
+        self.assertEqual(500, resp.status_code)
+        self.assertTrue(resp.json().startswith("ValidationError"))
+
+        task = {"name": "task", "finished_by": date.today().isoformat(), "type": TaskType.Task.value}
+        invalid = (
+            ({k: v for k, v in task.items() if k != "finished_by"}, "Missing data for required field"),
+            ({**task, "attachments": [{"location": "somewhere"}]}, "Relationships are not supported"),
+            ({**task, "owner": "someone"}, "Unknown field"),
+        )
+
+        for record, message in invalid:
+            resp = self.client.put("/task", params={"bulk": "true"}, json=[record])
+
+            self.assertEqual(500, resp.status_code)
+            self.assertTrue(resp.json().startswith("ValidationError"))
+            self.assertIn(message, resp.json())
+
+        self.assertEqual([], self.client.get("/task").json())
+
+    def test_DeleteRequiresKeysOrFilter(self):
+        self._add_tasks(0, 1)
+
+        for params in ({}, {"id": 1, "filter": "id == 1"}):
+            resp = self.client.delete("/task", params=params)
+
+            self.assertEqual(500, resp.status_code)
+            self.assertTrue(resp.json().startswith("ValueError"))
+
+        self.assertEqual(1, len(self.client.get("/task").json()))
+
+    def test_Changes(self):
+        tasks = [
+            {"name": f"task-{i}", "finished_by": date.today().isoformat(), "type": TaskType.Task.value}
+            for i in range(3)
+        ]
+
+        created = self.client.put("/tracked", json=tasks).json()
+        self.client.patch("/tracked", json=[{**created[0], "name": "renamed"}])
+        self.client.delete("/tracked", params={"id": created[1]["id"]})
+
+        changes = self.client.get("/tracked", params={"since": 0}).json()
+
+        self.assertEqual(5, changes["seq"])
+        self.assertEqual([created[2]["id"], created[0]["id"]], [t["id"] for t in changes["upserted"]])
+        self.assertEqual("renamed", changes["upserted"][1]["name"])
+        self.assertEqual([{"id": created[1]["id"]}], changes["deleted"])
+
+        page = self.client.get("/tracked", params={"since": 0, "page_size": 2}).json()
+        self.assertEqual((2, True), (page["seq"], page["more"]))
+
+        changes = self.client.get("/tracked", params={"since": changes["seq"]}).json()
+        self.assertEqual({"seq": 5, "upserted": [], "deleted": [], "more": False}, changes)
+
+        for params in ({"since": "latest"}, {"since": 0, "page_size": "all"}, {"since": 0, "page_size": 0}):
+            resp = self.client.get("/tracked", params=params)
+
+            self.assertEqual(500, resp.status_code)
+            self.assertTrue(resp.json().startswith("ValueError"))
+
+    def test_EndpointOfModel(self):
+        endpoint = DatabaseResource.make_endpoint(Task, self.session_factory, create_ignore=["id"])
+        self.assertIsNone(vars(endpoint)["schema"]._schema)
+
+        app = Starlette()
+        app.add_route("/task", endpoint)
+        client = TestClient(app)
+
+        task = {"name": "task", "finished_by": date.today().isoformat(), "type": TaskType.Task.value}
+        created = client.put("/task", json=[task]).json()
+
+        self.assertEqual([created[0]["id"]], [t["id"] for t in client.get("/task").json()])
+        self.assertIs(AutoMarshmallowSchema.generate_schema(Task), endpoint.schema)
+
+
+class ReplicaTest(unittest.TestCase):
+    def setUp(self):
+        self.factories = list()
+
+        for _ in range(2):
+            engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+            Base.metadata.create_all(engine)
+            self.factories.append(scoped_session(sessionmaker(bind=engine)))
+
+        primary, replica = self.factories
+        schema = AutoMarshmallowSchema.generate_schema(TaskWithRelationShip)
+
+        app = Starlette()
+        self.endpoint = DatabaseResource.make_endpoint(
+            schema, primary, create_ignore=["id"], read_session_factory=replica, read_your_writes=60.0
+        )
+        app.add_route("/task", self.endpoint)
+        app.add_route(
+            "/cached",
+            DatabaseResource.make_endpoint(
+                schema, primary, read_session_factory=replica, read_your_writes=60.0, cache=MemoryCache()
+            ),
+        )
+
+        self.app = app
+        self.client = TestClient(app)
+
+    def test_ReadsRunOnReplica(self):
+        task = {"name": "task", "finished_by": date.today().isoformat(), "type": TaskType.Task.value}
+        self.assertEqual(200, self.client.put("/task", json=[task]).status_code)
+
+        self.assertEqual(1, len(self.client.get("/task").json()))
+        self.assertEqual(1, len(self.client.get("/task", params={"ops": "for update"}).json()))
+
+        self.client.cookies.clear()
+        self.assertEqual(0, len(self.client.get("/task").json()))
+        self.assertEqual(1, len(self.client.get("/task", params={"ops": "for update"}).json()))
+
+    def test_LaggingReplicaIsNotCached(self):
+        task = {"name": "task", "finished_by": date.today().isoformat(), "type": TaskType.Task.value}
+        self.assertEqual(200, self.client.put("/task", json=[task]).status_code)
+
+        other = TestClient(self.app)
+        lagging = other.get("/cached")
+        self.assertEqual(0, len(lagging.json()))
+
+        resp = self.client.get("/cached", headers={"If-None-Match": lagging.headers["ETag"]})
+        self.assertEqual(200, resp.status_code)
+        self.assertEqual(1, len(resp.json()))
+
+        # NB: The result read by the writer from the primary is cached, and served to others from then on
+        self.assertEqual(1, len(other.get("/cached").json()))
+
+    def test_PoolStatus(self):
+        self.assertEqual({"primary", "replica_0"}, set(self.endpoint.pool_status().keys()))
+
+
+class MetricsTest(unittest.TestCase):
+    def setUp(self):
+        engine = self.engine = create_engine(
+            "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+        )
+        Base.metadata.create_all(engine)
+
+        self.metrics = Metrics()
+        self.metrics.instrument(engine)
+
+        app = Starlette()
+        schema = AutoMarshmallowSchema.generate_schema(Task)
+        session_factory = scoped_session(sessionmaker(bind=engine))
+        app.add_route("/task", DatabaseResource.make_endpoint(schema, session_factory, create_ignore=["id"]))
+        app.add_route("/metrics", self.metrics.make_endpoint())
+        app.add_route("/echo/{name}", lambda req: PlainTextResponse(req.path_params["name"]))
+        app.add_middleware(MetricsMiddleware, metrics=self.metrics)
+
+        self.client = TestClient(app)
+
+    def test_Metrics(self):
+        tasks = [
+            {"name": f"task-{i}", "finished_by": date.today().isoformat(), "type": TaskType.Task.value}
+            for i in range(3)
+        ]
+
+        self.client.put("/task", json=tasks)
+        resp = self.client.get("/task")
+
+        timing = resp.headers["Server-Timing"]
+        self.assertIn("serialize;dur=", timing)
+        self.assertIn('desc="1 statements, 3 rows"', timing)
+
+        text = self.client.get("/metrics").text
+        self.assertIn('pyalfred_request_duration_seconds_count{route="/task",method="GET"} 1', text)
+        self.assertIn('pyalfred_rows_total{route="/task",method="GET"} 3', text)
+        self.assertIn('pyalfred_requests_total{route="/task",method="PUT",status="200"} 1', text)
+
+    def test_FailingStatements(self):
+        task = {"name": "task", "finished_by": date.today().isoformat(), "type": TaskType.Task.value}
+        self.assertEqual(200, self.client.put("/task", json=[task]).status_code)
+
+        # NB: The unique name fails each insert, which thus never reaches `after_cursor_execute`
+        for _ in range(3):
+            self.assertEqual(500, self.client.put("/task", json=[task]).status_code)
+
+        with self.engine.connect() as conn:
+            self.assertNotIsInstance(conn.info.get("pyalfred_start"), list)
+
+        timing = self.client.get("/task").headers["Server-Timing"]
+        self.assertIn('desc="1 statements, 1 rows"', timing)
+
+    def test_LabelsByRouteTemplate(self):
+        for name in ("a", "b", 'c"\\'):
+            self.assertEqual(200, self.client.get(f"/echo/{name}").status_code)
+
+        self.assertEqual(404, self.client.get('/missing/"quoted"').status_code)
+        self.assertEqual(404, self.client.get("/missing/other").status_code)
+
+        self.metrics.observe('/a"b\\c\nd', "GET", 200, 0.0, RequestMetrics())
+
+        text = self.client.get("/metrics").text
+        self.assertIn('pyalfred_requests_total{route="/echo/{name}",method="GET",status="200"} 3', text)
+        self.assertIn('pyalfred_requests_total{route="<unmatched>",method="GET",status="404"} 2', text)
+        self.assertIn('pyalfred_requests_total{route="/a\\"b\\\\c\\nd",method="GET",status="200"} 1', text)
+        self.assertNotIn("missing", text)
+
+
+class AdmissionTest(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(self.engine)
+
+        self.session_factory = scoped_session(sessionmaker(bind=self.engine))
+        session = self.session_factory()
+        session.add_all(Task(name=f"task-{i}", finished_by=date.today(), type=TaskType.Task) for i in range(5))
+        session.commit()
+        self.session_factory.remove()
+
+        self.selects = 0
+        event.listen(self.engine, "before_cursor_execute", self._slow_select)
+
+    def tearDown(self):
+        event.remove(self.engine, "before_cursor_execute", self._slow_select)
+        self.engine.dispose()
+
+    def _slow_select(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            self.selects += 1
+            time.sleep(0.2)
+
+    def _get_concurrently(self, n: int, **kwargs) -> list:
+        app = Starlette()
+        schema = AutoMarshmallowSchema.generate_schema(Task)
+        app.add_route("/task", DatabaseResource.make_endpoint(schema, self.session_factory, **kwargs))
+
+        async def run():
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+                return await asyncio.gather(*(client.get("/task", params={"ops": "order by id"}) for _ in range(n)))
+
+        return asyncio.run(run())
+
+    def test_CoalesceReads(self):
+        responses = self._get_concurrently(10, coalesce_reads=True)
+
+        self.assertTrue(all(r.status_code == 200 for r in responses))
+        self.assertTrue(all(r.content == responses[0].content for r in responses))
+        self.assertEqual(5, len(responses[0].json()))
+        self.assertEqual(1, self.selects)
+
+    def test_RejectWhenQueueIsFull(self):
+        admission_control = AdmissionControl(max_concurrency=1, max_queue=1, retry_after=2)
+        responses = self._get_concurrently(4, admission_control=admission_control)
+
+        self.assertEqual([200, 200, 429, 429], sorted(r.status_code for r in responses))
+        self.assertTrue(all(r.headers["Retry-After"] == "2" for r in responses if r.status_code == 429))
+        self.assertEqual(2, self.selects)
+        self.assertEqual(0, admission_control.active)
+
+    def test_RejectWhenQueueTimesOut(self):
+        admission_control = AdmissionControl(max_concurrency=1, max_queue=2, queue_timeout=0.05)
+        responses = self._get_concurrently(3, admission_control={"get": admission_control})
+
+        self.assertEqual([200, 503, 503], sorted(r.status_code for r in responses))
+        self.assertEqual(0, admission_control.queued)
+
+
+if __name__ == "__main__":
+    unittest.main()